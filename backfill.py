@@ -0,0 +1,134 @@
+import argparse
+import logging
+import sys
+from http import HTTPStatus
+from typing import Optional
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import homework
+import http_session
+import json_stream
+import state_store
+import tenants
+from tenants import Tenant
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def _save(store: state_store.StateStore, batch: list[dict],
+          mark_seen: bool) -> None:
+    name = homework.tenant_name()
+    rows = [(homework.homework_key(item), item) for item in batch]
+    store.add_history(name, rows)
+    if mark_seen:
+        index = store.status_index(name)
+        for key, item in rows:
+            if 'status' in item:
+                index.mark(key, item['status'])
+
+
+def backfill_tenant(from_date: int, store: state_store.StateStore,
+                    batch_size: int = BATCH_SIZE,
+                    mark_seen: bool = False) -> int:
+    """
+    Загружает историю текущего студента начиная с from_date.
+    Массив homeworks разбирается потоково и пишется пачками по
+    batch_size работ; возвращает число сохранённых работ.
+    """
+    tenant = tenants.current()
+    headers = tenant.headers if tenant else homework.HEADERS
+    session = http_session.installed()
+    http_get = session.get if session else homework.requests.get
+    saved = 0
+    with http_get(homework.ENDPOINT, headers=headers,
+                  params={'from_date': from_date},
+                  timeout=(homework.CONNECT_TIMEOUT, homework.READ_TIMEOUT),
+                  stream=True) as response:
+        if response.status_code != HTTPStatus.OK:
+            raise RuntimeError(f'Код ответа: {response.status_code}')
+        stream = json_stream.ArrayStream(
+            response.iter_content(CHUNK_SIZE), 'homeworks'
+        )
+        batch = []
+        for item in stream:
+            if not isinstance(item, dict):
+                logging.warning(f'Пропущена работа не в виде словаря: {item}')
+                continue
+            batch.append(item)
+            if len(batch) >= batch_size:
+                _save(store, batch, mark_seen)
+                saved += len(batch)
+                batch = []
+        if batch:
+            _save(store, batch, mark_seen)
+            saved += len(batch)
+    if not stream.found:
+        raise KeyError('Отсутствует ключ "homeworks" в ответе API')
+    current_date = stream.fields.get('current_date')
+    if mark_seen and isinstance(current_date, int):
+        store.set_cursor(homework.tenant_name(), current_date)
+    return saved
+
+
+def backfill(from_date: int = 0,
+             tenant_list: Optional[list[Tenant]] = None,
+             batch_size: int = BATCH_SIZE,
+             mark_seen: bool = False) -> dict[str, int]:
+    """
+    Загружает историю всех студентов в общее хранилище.
+    Без списка студентов загружает историю владельца токенов из .env.
+    """
+    store = state_store.current()
+    saved = {}
+    for tenant in tenant_list or [None]:
+        with tenants.activate(tenant):
+            name = homework.tenant_name()
+            try:
+                saved[name] = backfill_tenant(from_date, store, batch_size,
+                                              mark_seen)
+            except Exception as error:
+                logging.error(f'Не удалось загрузить историю {name}: '
+                              f'{error}')
+                continue
+            logging.info(f'Загружено работ студента {name}: {saved[name]}')
+    store.flush()
+    return saved
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, int]:
+    """Разбирает параметры и загружает историю проверок."""
+    parser = argparse.ArgumentParser(
+        description='Загрузка истории проверок работ в локальное хранилище.'
+    )
+    parser.add_argument('--from-date', type=int, default=0,
+                        help='метка времени Unix, с которой грузить историю')
+    parser.add_argument('--tenants-file', default=homework.TENANTS_FILE)
+    parser.add_argument('--db', default=homework.STATE_DB_PATH,
+                        help='путь к базе SQLite')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--mark-seen', action='store_true',
+                        help='не уведомлять о загруженных статусах')
+    args = parser.parse_args(argv)
+    tenant_list = None
+    if args.tenants_file:
+        tenant_list = tenants.load_tenants(args.tenants_file)
+    elif not homework.PRACTICUM_TOKEN:
+        logging.critical('Отсутствует токен PRACTICUM_TOKEN')
+        sys.exit(1)
+    store = state_store.install(state_store.open_store(args.db))
+    http_session.install()
+    try:
+        return backfill(args.from_date, tenant_list, args.batch_size,
+                        args.mark_seen)
+    finally:
+        http_session.uninstall()
+        store.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=homework.LOG_TEXT_FORMAT)
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('telegram.bot', 'requests.sessions', 'urllib3', 'dotenv',
+                 'http.server')
+PROBE = (
+    'import sys, time\n'
+    'started = time.perf_counter()\n'
+    'import {module}\n'
+    'elapsed = time.perf_counter() - started\n'
+    'heavy = [name for name in {heavy!r} if name in sys.modules]\n'
+    'print(elapsed, *heavy)\n'
+)
+
+
+def measure(module: str = 'homework', runs: int = 10) -> dict:
+    """
+    Замеряет время импорта модуля в свежих интерпретаторах.
+    Возвращает медиану, минимум и загруженные тяжёлые модули.
+    """
+    samples, heavy = [], set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c',
+             PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout.split()
+        samples.append(float(output[0]))
+        heavy.update(output[1:])
+    return {'module': module,
+            'median_ms': round(statistics.median(samples) * 1000, 1),
+            'min_ms': round(min(samples) * 1000, 1),
+            'heavy_modules': sorted(heavy)}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Печатает замер и возвращает 1, если превышен порог --max-ms."""
+    parser = argparse.ArgumentParser(description='Время импорта модуля.')
+    parser.add_argument('--module', default='homework')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float,
+                        help='допустимая медиана времени импорта')
+    args = parser.parse_args(argv)
+    report = measure(args.module, args.runs)
+    print(report)
+    if args.max_ms is not None and report['median_ms'] > args.max_ms:
+        print(f'Импорт {args.module} дольше {args.max_ms} мс',
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
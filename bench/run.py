@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import urllib.request
+from typing import Optional
+
+import telegram
+
+import homework
+import http_session
+import outbox
+import polling_policy
+import state_store
+from bench import stubs
+from engine import PollingEngine
+from tenants import Tenant
+
+BOT_TOKEN = '123456:bench'
+API_PATH = '/api/user_api/homework_statuses/'
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    """Возвращает квантиль q отсортированного списка или None."""
+    if not values:
+        return None
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def current_rss() -> int:
+    """Возвращает текущий RSS процесса в байтах или 0."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+async def _run_for(engine: PollingEngine, duration: float) -> None:
+    asyncio.get_running_loop().call_later(duration, engine.stop)
+    await engine.run(deadline=0)
+
+
+def run_bench(args: argparse.Namespace, practicum_port: int,
+              telegram_port: int) -> dict:
+    """
+    Прогоняет движок опроса против заглушек и возвращает отчёт.
+    Процессорное время и RSS относятся только к процессу бота.
+    """
+    homework.ENDPOINT = f'http://127.0.0.1:{practicum_port}{API_PATH}'
+    homework.TELEGRAM_TOKEN = BOT_TOKEN
+    bot = telegram.Bot(BOT_TOKEN,
+                       base_url=f'http://127.0.0.1:{telegram_port}/bot')
+    with tempfile.TemporaryDirectory() as directory:
+        store = state_store.install(
+            state_store.open_store(os.path.join(directory, 'state.sqlite3'))
+        )
+        box = outbox.install(
+            outbox.Outbox(os.path.join(directory, 'outbox.jsonl'))
+        )
+        http_session.install(pool_maxsize=args.max_in_flight)
+        try:
+            engine = PollingEngine(
+                [Tenant(f'tenant-{number}', f'token-{number}', number)
+                 for number in range(args.tenants)],
+                bot_factory=lambda token: bot,
+                max_in_flight=args.max_in_flight, tick=args.tick,
+                startup_window=args.interval,
+            )
+            for state in engine.states.values():
+                state.policy = polling_policy.PollPolicy(
+                    base=args.interval, reviewing=args.interval,
+                    max_idle=args.interval, max_error=args.interval,
+                    jitter=0,
+                )
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            started = time.perf_counter()
+            asyncio.run(_run_for(engine, args.duration))
+            elapsed = time.perf_counter() - started
+            finished = resource.getrusage(resource.RUSAGE_SELF)
+        finally:
+            http_session.uninstall()
+            store.close()
+            box.close()
+    with urllib.request.urlopen(
+        f'http://127.0.0.1:{practicum_port}/stats', timeout=10
+    ) as response:
+        stats = json.load(response)
+    latencies = stats.pop('latencies')
+    cpu = (finished.ru_utime - usage.ru_utime
+           + finished.ru_stime - usage.ru_stime)
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    return {
+        'tenants': args.tenants,
+        'seconds': round(elapsed, 2),
+        'polls_per_second': round(stats['polls'] / elapsed, 1),
+        'notifications': len(latencies),
+        'notify_p50_ms': None if p50 is None else round(p50 * 1000, 1),
+        'notify_p99_ms': None if p99 is None else round(p99 * 1000, 1),
+        'cpu_seconds': round(cpu, 2),
+        'cpu_percent': round(100 * cpu / elapsed, 1),
+        'rss_mb': round(current_rss() / 2 ** 20, 1),
+        'max_rss_mb': round(finished.ru_maxrss / 1024, 1),
+        **stats,
+    }
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Разбирает параметры прогона."""
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный прогон бота против локальных заглушек.'
+    )
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='пауза между опросами одного студента, с')
+    parser.add_argument('--tick', type=float, default=0.05)
+    parser.add_argument('--max-in-flight', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='задержка ответа Практикума, с')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--change-rate', type=float, default=0.2,
+                        help='доля опросов со сменой статуса')
+    parser.add_argument('--comment-size', type=int, default=256,
+                        help='размер комментария ревьюера, байт')
+    parser.add_argument('--telegram-latency', type=float, default=0.02)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    parser.add_argument('--json', action='store_true',
+                        help='вывести отчёт в JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    """Запускает заглушки в отдельном процессе и прогоняет бота."""
+    args = parse_args(argv)
+    config = stubs.StubConfig(
+        latency=args.latency, error_rate=args.error_rate,
+        change_rate=args.change_rate, comment_size=args.comment_size,
+        telegram_latency=args.telegram_latency,
+        telegram_error_rate=args.telegram_error_rate,
+    )
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=stubs.serve, args=(config, sender),
+                              daemon=True)
+    process.start()
+    try:
+        practicum_port, telegram_port = receiver.recv()
+        report = run_bench(args, practicum_port, telegram_port)
+    finally:
+        process.terminate()
+        process.join()
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        for name, value in report.items():
+            print(f'{name:>22}: {value}')
+    return report
+
+
+if __name__ == '__main__':
+    main()
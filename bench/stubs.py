@@ -0,0 +1,186 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EVENTS_PER_TENANT = 16
+STATUSES = ('reviewing', 'approved', 'rejected')
+_NAME = re.compile(r'работы "([^"]+)"')
+
+
+@dataclass
+class StubConfig:
+    """Поведение заглушек Практикума и Bot API."""
+
+    latency: float = 0.05
+    error_rate: float = 0.0
+    change_rate: float = 0.2
+    comment_size: int = 256
+    telegram_latency: float = 0.02
+    telegram_error_rate: float = 0.0
+    seed: int = 0
+
+
+class StubState:
+    """
+    Общее состояние заглушек.
+    Практикум запоминает момент каждой смены статуса, Bot API по
+    названию работы в тексте сообщения считает задержку уведомления.
+    """
+
+    def __init__(self, config: StubConfig) -> None:
+        """Создаёт пустое состояние."""
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.events: dict[str, deque] = {}
+        self.changed_at: dict[str, float] = {}
+        self.next_id = 1
+        self.polls = 0
+        self.api_errors = 0
+        self.messages = 0
+        self.telegram_errors = 0
+        self.latencies: list[float] = []
+
+    def homeworks(self, token: str, from_date: int) -> list[dict]:
+        """Возвращает работы студента, изменившиеся с from_date."""
+        now = time.time()
+        with self.lock:
+            self.polls += 1
+            events = self.events.setdefault(
+                token, deque(maxlen=EVENTS_PER_TENANT)
+            )
+            if self.random.random() < self.config.change_rate:
+                name = f'{token}/{self.next_id}'
+                events.append({
+                    'id': self.next_id,
+                    'homework_name': name,
+                    'status': self.random.choice(STATUSES),
+                    'date_updated': int(now),
+                    'reviewer_comment': 'x' * self.config.comment_size,
+                })
+                self.changed_at[name] = now
+                self.next_id += 1
+            return [homework for homework in events
+                    if homework['date_updated'] >= from_date]
+
+    def received(self, text: str) -> None:
+        """Отмечает доставленное в Telegram сообщение."""
+        now = time.time()
+        with self.lock:
+            self.messages += 1
+            for name in _NAME.findall(text):
+                changed = self.changed_at.pop(name, None)
+                if changed is not None:
+                    self.latencies.append(now - changed)
+
+    def snapshot(self) -> dict:
+        """Возвращает счётчики заглушек."""
+        with self.lock:
+            return {'polls': self.polls, 'api_errors': self.api_errors,
+                    'messages': self.messages,
+                    'telegram_errors': self.telegram_errors,
+                    'pending_notifications': len(self.changed_at),
+                    'latencies': sorted(self.latencies)}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: StubState
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self, latency: float) -> None:
+        time.sleep(latency * self.state.random.uniform(0.5, 1.5))
+
+    def _failed(self, rate: float) -> bool:
+        return self.state.random.random() < rate
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class PracticumHandler(_StubHandler):
+    """Заглушка API статусов домашних работ."""
+
+    def do_GET(self) -> None:
+        """Отвечает списком изменившихся работ или статистикой."""
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            self._reply(200, self.state.snapshot())
+            return
+        config = self.state.config
+        self._delay(config.latency)
+        if self._failed(config.error_rate):
+            with self.state.lock:
+                self.state.api_errors += 1
+            self._reply(500, {'code': 'stub_error'})
+            return
+        token = self.headers.get('Authorization', '').removeprefix('OAuth ')
+        from_date = int(parse_qs(url.query).get('from_date', ['0'])[0])
+        self._reply(200, {
+            'homeworks': self.state.homeworks(token, from_date),
+            'current_date': int(time.time()),
+        })
+
+
+class TelegramHandler(_StubHandler):
+    """Заглушка метода sendMessage Bot API."""
+
+    def do_POST(self) -> None:
+        """Принимает сообщение и отвечает как Bot API."""
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        config = self.state.config
+        self._delay(config.telegram_latency)
+        if self._failed(config.telegram_error_rate):
+            with self.state.lock:
+                self.state.telegram_errors += 1
+            self._reply(502, {'ok': False, 'error_code': 502,
+                              'description': 'Bad Gateway'})
+            return
+        self.state.received(data.get('text', ''))
+        self._reply(200, {'ok': True, 'result': {
+            'message_id': 1,
+            'date': int(time.time()),
+            'chat': {'id': data.get('chat_id', 0), 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+
+def start_servers(config: StubConfig,
+                  host: str = '127.0.0.1') -> tuple[ThreadingHTTPServer,
+                                                    ThreadingHTTPServer]:
+    """Запускает заглушки Практикума и Bot API в фоновых потоках."""
+    state = StubState(config)
+    servers = []
+    for handler in (PracticumHandler, TelegramHandler):
+        bound = type(handler.__name__, (handler,), {'state': state})
+        server = ThreadingHTTPServer((host, 0), bound)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, args=(0.05,),
+                         daemon=True).start()
+        servers.append(server)
+    return servers[0], servers[1]
+
+
+def serve(config: StubConfig, connection) -> None:
+    """
+    Точка входа процесса заглушек.
+    Отправляет родителю порты серверов и работает до завершения.
+    """
+    practicum, telegram = start_servers(config)
+    connection.send((practicum.server_address[1],
+                     telegram.server_address[1]))
+    threading.Event().wait()
@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+import telegram
+
+import metrics
+
+MAX_BOTS = int(os.getenv('TELEGRAM_MAX_BOTS', 256))
+POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', 8))
+CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', 5))
+WARM_UP_WORKERS = 8
+
+
+def create_bot(token: str, pool_size: int = POOL_SIZE) -> telegram.Bot:
+    """
+    Создаёт бота с пулом на pool_size соединений к api.telegram.org.
+    Соединения пула живут между запросами и держат TCP keep-alive.
+    """
+    from telegram.utils.request import Request
+    return telegram.Bot(token=token, request=Request(
+        con_pool_size=pool_size, connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT
+    ))
+
+
+def close_bot(bot: telegram.Bot) -> None:
+    """Закрывает соединения пула бота."""
+    request = getattr(bot, 'request', None)
+    if request is not None:
+        request.stop()
+
+
+class BotRegistry:
+    """
+    Кэш ботов Telegram по токену.
+    Бот и его пул соединений создаются один раз на токен; при
+    превышении max_size вытесняется бот, к которому дольше всего не
+    обращались, и его соединения закрываются.
+    """
+
+    def __init__(self, max_size: int = MAX_BOTS,
+                 factory: Callable[[str], telegram.Bot] = create_bot,
+                 close: Callable[[telegram.Bot], None] = close_bot) -> None:
+        """Создаёт пустой кэш."""
+        self.max_size = max_size
+        self.evicted = 0
+        self._factory = factory
+        self._close = close
+        self._bots: OrderedDict[str, telegram.Bot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Возвращает число ботов в кэше."""
+        return len(self._bots)
+
+    def get(self, token: str) -> telegram.Bot:
+        """Возвращает бота токена, создавая его при первом обращении."""
+        with self._lock:
+            bot = self._bots.get(token)
+            if bot is not None:
+                self._bots.move_to_end(token)
+                return bot
+            bot = self._bots[token] = self._factory(token)
+            evicted = []
+            while len(self._bots) > self.max_size:
+                evicted.append(self._bots.popitem(last=False)[1])
+            self.evicted += len(evicted)
+        for old_bot in evicted:
+            self._close(old_bot)
+        return bot
+
+    def _warm_up_one(self, token: str) -> bool:
+        try:
+            self.get(token).get_me()
+        except telegram.TelegramError as error:
+            logging.warning(f'Не удалось подключиться к Telegram: {error}')
+            return False
+        return True
+
+    def warm_up(self, tokens: Iterable[str]) -> int:
+        """
+        Создаёт ботов и открывает их соединения запросом getMe.
+        Возвращает число ботов, ответивших без ошибки.
+        """
+        tokens = list(dict.fromkeys(filter(None, tokens)))[:self.max_size]
+        if not tokens:
+            return 0
+        workers = min(WARM_UP_WORKERS, len(tokens))
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='warm-up') as executor:
+            ready = sum(executor.map(self._warm_up_one, tokens))
+        logging.info(f'Прогреты соединения ботов: {ready} из {len(tokens)}')
+        return ready
+
+    def close(self) -> None:
+        """Закрывает соединения всех ботов и очищает кэш."""
+        with self._lock:
+            bots, self._bots = list(self._bots.values()), OrderedDict()
+        for bot in bots:
+            self._close(bot)
+
+
+_registry = BotRegistry()
+
+
+def install(registry: BotRegistry) -> BotRegistry:
+    """Делает кэш ботов общим для процесса."""
+    global _registry
+    previous, _registry = _registry, registry
+    if previous is not registry:
+        previous.close()
+    return registry
+
+
+def current() -> BotRegistry:
+    """Возвращает общий кэш ботов."""
+    return _registry
+
+
+metrics.gauge('bot_telegram_bots_cached', 'Боты Telegram в кэше.',
+              lambda: len(current()))
+metrics.counter('bot_telegram_bots_evicted_total',
+                'Боты, вытесненные из кэша.', lambda: current().evicted)
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from exceptions import CircuitOpenError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURE_RATE = 0.5
+MIN_CALLS = 10
+WINDOW = 60.0
+OPEN_TIMEOUT = 30.0
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешнего сервиса.
+    Размыкается, когда доля сбоев за окно window достигает failure_rate
+    (при числе вызовов не меньше min_calls). Пока разомкнут, вызовы
+    сразу отклоняются; через open_timeout пропускается один пробный
+    вызов, и по его исходу предохранитель замыкается или снова
+    размыкается.
+    """
+
+    def __init__(self, name: str, failure_rate: float = FAILURE_RATE,
+                 min_calls: int = MIN_CALLS, window: float = WINDOW,
+                 open_timeout: float = OPEN_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт замкнутый предохранитель."""
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_timeout = open_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._failures = 0
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started = None
+        self.rejected = 0
+        self.opened = 0
+
+    def _transition(self, state: str) -> None:
+        logging.warning(f'Предохранитель {self.name}: '
+                        f'{self.state} -> {state}')
+        self.state = state
+        if state == OPEN:
+            self.opened += 1
+            self._opened_at = self._clock()
+        self._calls.clear()
+        self._failures = 0
+        self._probe_started = None
+
+    def before_call(self) -> None:
+        """Пропускает вызов или выбрасывает CircuitOpenError."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = self._clock()
+            if self.state == OPEN and now - self._opened_at >= (
+                    self.open_timeout):
+                self._transition(HALF_OPEN)
+            probe_stale = (self._probe_started is not None and now
+                           - self._probe_started >= self.open_timeout)
+            if self.state == HALF_OPEN and (
+                    self._probe_started is None or probe_stale):
+                self._probe_started = now
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f'{self.name} недоступен, запрос пропущен')
+
+    def record(self, success: bool) -> None:
+        """Учитывает исход вызова."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED if success else OPEN)
+                return
+            if self.state == OPEN:
+                return
+            now = self._clock()
+            self._calls.append((now, success))
+            self._failures += not success
+            while self._calls and now - self._calls[0][0] > self.window:
+                self._failures -= not self._calls.popleft()[1]
+            calls = len(self._calls)
+            if calls >= self.min_calls and (
+                    self._failures / calls >= self.failure_rate):
+                self._transition(OPEN)
+
+    def record_success(self) -> None:
+        """Учитывает успешный вызов."""
+        self.record(True)
+
+    def record_failure(self) -> None:
+        """Учитывает неудачный вызов."""
+        self.record(False)
+
+    def stats(self) -> dict:
+        """Возвращает состояние и счётчики предохранителя."""
+        with self._lock:
+            return {'state': self.state, 'opened': self.opened,
+                    'rejected': self.rejected}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(key: str) -> CircuitBreaker:
+    """Возвращает общий для процесса предохранитель по ключу."""
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(key)
+        return breaker
+
+
+def breakers() -> dict[str, CircuitBreaker]:
+    """Возвращает все созданные предохранители."""
+    with _breakers_lock:
+        return dict(_breakers)
+
+
+def reset() -> None:
+    """Забывает все предохранители."""
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,46 @@
+import os
+from typing import Callable, Iterable
+
+WINDOW = float(os.getenv('DIGEST_WINDOW', 0))
+URGENT_STATUSES = frozenset(
+    filter(None, os.getenv('DIGEST_URGENT_STATUSES', 'rejected').split(','))
+)
+MAX_MESSAGE_LENGTH = 4096
+HEADER = 'Изменения статусов проверки:'
+SEPARATOR = '\n\n'
+
+
+def is_urgent(status: str) -> bool:
+    """Проверяет, что статус отправляется сразу, минуя сводку."""
+    return status in URGENT_STATUSES
+
+
+def render(texts: list[str]) -> str:
+    """Собирает сообщения в одну сводку; одно сообщение не меняется."""
+    if len(texts) == 1:
+        return texts[0]
+    return SEPARATOR.join([HEADER, *texts])
+
+
+def fits(texts: list[str], limit: int = MAX_MESSAGE_LENGTH) -> bool:
+    """Проверяет, что сводка помещается в одно сообщение Telegram."""
+    return len(render(texts)) <= limit
+
+
+def batches(items: Iterable,
+            text: Callable[[object], str] = lambda item: item.text,
+            limit: int = MAX_MESSAGE_LENGTH) -> list[list]:
+    """
+    Делит элементы на сводки не длиннее limit по порядку.
+    Элемент, который не помещается даже один, идёт отдельной сводкой.
+    """
+    groups: list[list] = []
+    texts: list[str] = []
+    for item in items:
+        if groups and fits([*texts, text(item)], limit):
+            groups[-1].append(item)
+            texts.append(text(item))
+        else:
+            groups.append([item])
+            texts = [text(item)]
+    return groups
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import telegram
+
+import bot_registry
+import homework
+import http_session
+import leases
+import metrics
+import outbox
+import polling_policy
+import profiling
+import shutdown
+import state_store
+import tenants
+from outbound import OutboundQueue, QueueingBot
+from tenants import Tenant
+from timer_wheel import TimerWheel
+
+MAX_IN_FLIGHT = 64
+REQUESTS_PER_HOUR = float(os.getenv('POLL_REQUESTS_PER_HOUR', 0))
+TICK = float(os.getenv('POLL_TICK', 1.0))
+STARTUP_WINDOW = float(os.getenv('POLL_STARTUP_WINDOW', 60))
+OUTBOX_RETRY_INTERVAL = 1.0
+
+
+@dataclass
+class TenantState:
+    """Состояние опроса одного студента между циклами."""
+
+    timestamp: int = field(default_factory=lambda: int(time.time()))
+    outcome: str = polling_policy.IDLE
+    policy: polling_policy.PollPolicy = field(
+        default_factory=polling_policy.PollPolicy
+    )
+
+
+class PollingEngine:
+    """
+    Асинхронный планировщик опроса API для множества студентов.
+    Каждый цикл студента проходит конвейер homework.poll_cycle в пуле
+    потоков, число одновременных запросов ограничено max_in_flight.
+    Уведомления не отправляются из цикла опроса, а ставятся в очередь
+    outbound с ограничением частоты отправки в Telegram.
+    Паузу между опросами студента выбирает его PollPolicy; общий
+    бюджет requests_per_hour ограничивает частоту запросов всех студентов.
+    Опросы планируются колесом таймеров, первые из них равномерно
+    распределяются по окну startup_window.
+    """
+
+    def __init__(self, tenant_list: list[Tenant],
+                 bot_factory: Callable[[str], telegram.Bot] = None,
+                 max_in_flight: int = MAX_IN_FLIGHT,
+                 requests_per_hour: float = REQUESTS_PER_HOUR,
+                 tick: float = TICK,
+                 startup_window: float = STARTUP_WINDOW,
+                 keeper: Optional[leases.LeaseKeeper] = None) -> None:
+        """
+        Готовит состояние студентов и ограничитель параллелизма.
+        С keeper опрашиваются только студенты, чья аренда у реплики.
+        """
+        self.keeper = keeper
+        self.tenants = list(tenant_list)
+        self._by_name = {tenant.name: tenant for tenant in self.tenants}
+        self.budget = None
+        if requests_per_hour:
+            self.budget = polling_policy.RequestBudget(requests_per_hour)
+        self.states = {tenant.name: self._restore_state(tenant)
+                       for tenant in self.tenants}
+        self.max_in_flight = max_in_flight
+        self.tick = tick
+        self.startup_window = startup_window
+        self.wheel: Optional[TimerWheel] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._bot_factory = bot_factory or bot_registry.current().get
+        self.outbound = OutboundQueue()
+        metrics.gauge('bot_outbound_queue_depth',
+                      'Сообщения в очереди отправки в Telegram.',
+                      lambda: len(self.outbound))
+        metrics.gauge('bot_polls_in_flight', 'Выполняющиеся опросы API.',
+                      lambda: len(self._tasks))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def _restore_state(self, tenant: Tenant) -> TenantState:
+        state = TenantState(
+            policy=polling_policy.PollPolicy(base=homework.RETRY_PERIOD,
+                                             standby=leases.LEASE_TTL,
+                                             budget=self.budget)
+        )
+        cursor = state_store.current().get_cursor(tenant.name)
+        if cursor is not None:
+            state.timestamp = cursor
+        return state
+
+    def bot_for(self, tenant: Tenant) -> QueueingBot:
+        """
+        Возвращает бота студента из кэша ботов по токену.
+        Сообщения такого бота попадают в очередь отправки.
+        """
+        token = tenant.telegram_token or homework.TELEGRAM_TOKEN
+        return QueueingBot(self._bot_factory(token), self.outbound)
+
+    def holds(self, tenant: Tenant) -> bool:
+        """Проверяет, что студента опрашивает эта реплика."""
+        return self.keeper is None or self.keeper.holds(tenant.name)
+
+    def _poll_sync(self, tenant: Tenant) -> None:
+        state = self.states[tenant.name]
+        if not self.holds(tenant):
+            state.outcome = polling_policy.STANDBY
+            return
+        with tenants.activate(tenant):
+            if self.keeper is not None and self.keeper.gained(tenant.name):
+                state.timestamp = homework.resume_tenant(state.timestamp)
+            state.timestamp, state.outcome = homework.poll_cycle(
+                self.bot_for(tenant), state.timestamp
+            )
+
+    async def poll_once(self, tenant: Tenant) -> None:
+        """Выполняет один цикл опроса студента в пуле потоков."""
+        async with self._semaphore:
+            await asyncio.to_thread(self._poll_sync, tenant)
+
+    async def _poll_and_reschedule(self, tenant: Tenant) -> None:
+        state = self.states[tenant.name]
+        try:
+            await self.poll_once(tenant)
+        except Exception as error:
+            state.outcome = polling_policy.ERROR
+            logging.exception(f'Сбой опроса студента {tenant.name}: {error}')
+        self.wheel.schedule(state.policy.next_delay(state.outcome), tenant)
+
+    def _start_poll(self, tenant: Tenant) -> None:
+        task = asyncio.create_task(self._poll_and_reschedule(tenant))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drive_wheel(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.wheel = TimerWheel(tick=self.tick, start=loop.time())
+        self.wheel.stagger(self.tenants, self.startup_window)
+        while True:
+            for tenant in self.wheel.advance(loop.time()):
+                self._start_poll(tenant)
+            await asyncio.sleep(self.wheel.now + self.tick - loop.time())
+
+    def retry_undelivered(self) -> None:
+        """Ставит в очередь сообщения журнала, которым пора повторить."""
+        for name in outbox.current().tenants_with_due():
+            tenant = self._by_name.get(name)
+            if tenant is None or not self.holds(tenant):
+                continue
+            with tenants.activate(tenant):
+                homework.retry_undelivered(self.bot_for(tenant))
+
+    async def _drain_outbox(self) -> None:
+        while True:
+            await asyncio.sleep(OUTBOX_RETRY_INTERVAL)
+            self.retry_undelivered()
+
+    async def _flush_loop(self) -> None:
+        store = state_store.current()
+        while True:
+            await asyncio.sleep(state_store.FLUSH_INTERVAL)
+            await asyncio.to_thread(store.flush)
+
+    def stop(self) -> None:
+        """Запрашивает остановку: новые опросы больше не начинаются."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def _refuse_profiling(self) -> None:
+        logging.warning(profiling.UNSUPPORTED)
+
+    def _watch_signals(self, loop: asyncio.AbstractEventLoop) -> list[int]:
+        handlers = dict.fromkeys(shutdown.SIGNALS, self.stop)
+        handlers[profiling.SIGNAL] = self._refuse_profiling
+        installed = []
+        for signum, handler in handlers.items():
+            try:
+                loop.add_signal_handler(signum, handler)
+            except (NotImplementedError, RuntimeError, ValueError):
+                continue
+            installed.append(signum)
+        return installed
+
+    async def drain(self, deadline: float = shutdown.DEADLINE) -> None:
+        """
+        Дожидается начатых опросов и отправки очереди в пределах deadline.
+        Затем сбрасывает состояние на диск.
+        """
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + deadline
+        if self._tasks:
+            logging.info(f'Ожидание начатых опросов: {len(self._tasks)}')
+            await asyncio.wait(set(self._tasks), timeout=deadline)
+        remaining = max(expires - loop.time(), 0)
+        if not await asyncio.to_thread(self.outbound.drain, remaining):
+            logging.warning(f'Не отправлено сообщений до остановки: '
+                            f'{len(self.outbound)}')
+        await asyncio.to_thread(state_store.current().flush)
+
+    async def run(self, deadline: float = shutdown.DEADLINE) -> None:
+        """
+        Опрашивает всех студентов до вызова stop, SIGTERM или SIGINT.
+        При остановке новые опросы не начинаются, а начатые опросы и
+        очередь отправки дорабатывают в пределах deadline секунд.
+        """
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=self.max_in_flight,
+                               thread_name_prefix='poll')
+        )
+        signals = self._watch_signals(loop)
+        logging.info(f'Запущен опрос студентов: {len(self.tenants)}')
+        self.outbound.start()
+        workers = [asyncio.create_task(worker) for worker in (
+            self._flush_loop(), self._drain_outbox(), self._drive_wheel()
+        )]
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            done, _ = await asyncio.wait([stopping, *workers],
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stopping:
+                    task.result()
+            logging.info('Получен запрос остановки, опрос завершается')
+        finally:
+            for task in (stopping, *workers):
+                task.cancel()
+            for signum in signals:
+                loop.remove_signal_handler(signum)
+            try:
+                await self.drain(deadline)
+            finally:
+                self.outbound.stop()
+
+
+def run(path: str, max_in_flight: int = MAX_IN_FLIGHT,
+        tenant_filter: Callable[[Tenant], bool] = None,
+        outbox_path: str = None) -> None:
+    """
+    Загружает студентов из файла и запускает движок опроса.
+    tenant_filter оставляет только студентов своего шарда, у каждого
+    шарда свой журнал исходящих outbox_path.
+    """
+    with profiling.signal_handler(signal.SIG_IGN):
+        store = state_store.install(
+            state_store.open_store(homework.STATE_DB_PATH)
+        )
+        box = outbox.install(
+            outbox.Outbox(outbox_path or homework.OUTBOX_PATH)
+        )
+        tenant_list = tenants.load_tenants(path)
+        if tenant_filter is not None:
+            tenant_list = list(filter(tenant_filter, tenant_list))
+        keeper = leases.LeaseKeeper(
+            leases.open_backend(leases.LEASE_DB_PATH),
+            [tenant.name for tenant in tenant_list]
+        ).start()
+        engine = PollingEngine(tenant_list, max_in_flight=max_in_flight,
+                               keeper=keeper)
+        http_session.install(pool_maxsize=max_in_flight)
+        bots = bot_registry.current()
+        bots.warm_up(tenant.telegram_token or homework.TELEGRAM_TOKEN
+                     for tenant in tenant_list)
+        try:
+            asyncio.run(engine.run())
+        finally:
+            keeper.stop()
+            bots.close()
+            http_session.uninstall()
+            store.close()
+            box.close()
@@ -0,0 +1,84 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+TTL = 3600.0
+MAX_SIZE = 1024
+
+_VOLATILE_PARTS = (
+    (re.compile(r'https?://\S+'), '<url>'),
+    (re.compile(r'0x[0-9a-fA-F]+'), '<hex>'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}\b'), '<uuid>'),
+    (re.compile(r'\d+(\.\d+)?'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(message: str) -> str:
+    """
+    Приводит текст ошибки к отпечатку.
+    Числа, адреса и идентификаторы заменяются заглушками.
+    """
+    for pattern, replacement in _VOLATILE_PARTS:
+        message = pattern.sub(replacement, message)
+    return message.strip().lower()
+
+
+@dataclass
+class _Seen:
+    first_seen: float
+    suppressed: int = 0
+
+
+class ErrorDeduplicator:
+    """
+    Таблица недавних ошибок с вытеснением LRU и сроком жизни ttl.
+    Первая ошибка с новым отпечатком отправляется сразу, повторы в
+    течение ttl подавляются и считаются. Повтор после истечения ttl
+    отправляется со сводкой о числе подавленных сообщений.
+    """
+
+    def __init__(self, ttl: float = TTL, max_size: int = MAX_SIZE,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт пустую таблицу."""
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._seen: OrderedDict[tuple[str, str], _Seen] = OrderedDict()
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def _summary(self, message: str, seen: _Seen) -> str:
+        if not seen.suppressed:
+            return message
+        minutes = round(self.ttl / 60)
+        return (f'{message} (повторялась ещё {seen.suppressed} раз за '
+                f'последние {minutes} мин.)')
+
+    def check(self, scope: str, message: str) -> Optional[str]:
+        """
+        Возвращает текст для отправки или None для подавленной ошибки.
+        scope разделяет таблицы разных студентов.
+        """
+        key = (scope, fingerprint(message))
+        now = self._clock()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen.first_seen < self.ttl:
+                seen.suppressed += 1
+                self.suppressed += 1
+                self._seen.move_to_end(key)
+                return None
+            self._seen[key] = _Seen(now)
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+        return message if seen is None else self._summary(message, seen)
+
+    def clear(self) -> None:
+        """Забывает все ошибки."""
+        with self._lock:
+            self._seen.clear()
@@ -5,3 +5,21 @@ class CurrentDateError(Exception):
     """
 
     pass
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Исключение, которое сигнализирует, что запрос к API.
+    не отправлен: предохранитель разомкнут после серии сбоев.
+    """
+
+    pass
+
+
+class ShutdownRequested(BaseException):
+    """
+    Исключение, которое прерывает паузу между опросами.
+    по сигналу остановки процесса.
+    """
+
+    pass
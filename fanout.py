@@ -0,0 +1,35 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+WORKERS = int(os.getenv('FANOUT_WORKERS', 8))
+
+T = TypeVar('T')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS,
+                                           thread_name_prefix='fanout')
+        return _executor
+
+
+def run_all(calls: list[Callable[[], T]]) -> list[T]:
+    """
+    Выполняет вызовы параллельно, не больше WORKERS одновременно.
+    Каждый вызов видит контекст вызывающего потока (текущего студента).
+    Единственный вызов выполняется сразу, без пула потоков.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+    pool = _pool()
+    futures = [pool.submit(contextvars.copy_context().run, call)
+               for call in calls]
+    return [future.result() for future in futures]
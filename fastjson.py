@@ -0,0 +1,43 @@
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Decoder = Callable[[bytes], Any]
+
+_decoder: Optional[Decoder] = orjson.loads if orjson else None
+
+
+def set_decoder(decoder: Optional[Decoder]) -> None:
+    """
+    Назначает функцию разбора тела ответа в байтах.
+    None возвращает разбор через response.json().
+    """
+    global _decoder
+    _decoder = decoder
+
+
+def decoder() -> Optional[Decoder]:
+    """Возвращает текущую функцию разбора или None."""
+    return _decoder
+
+
+def decode(response) -> Any:
+    """
+    Разбирает JSON из ответа HTTP.
+    Быстрый декодер читает байты тела напрямую; ответы без content и
+    режим без декодера разбираются через response.json(). Ошибки
+    разбора приводятся к json.JSONDecodeError.
+    """
+    content = getattr(response, 'content', None)
+    if _decoder is None or not isinstance(content, (bytes, bytearray)):
+        return response.json()
+    try:
+        return _decoder(content)
+    except json.JSONDecodeError:
+        raise
+    except ValueError as error:
+        raise json.JSONDecodeError(str(error), '', 0) from error
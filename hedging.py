@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from typing import Callable, Optional, TypeVar
+
+MAX_WORKERS = 128
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+HEDGE_QUANTILE = 0.95
+MIN_HEDGE_DELAY = 0.5
+DEFAULT_HEDGE_DELAY = 2.0
+
+T = TypeVar('T')
+
+
+class LatencyTracker:
+    """Скользящее окно длительностей успешных запросов."""
+
+    def __init__(self, size: int = LATENCY_WINDOW) -> None:
+        """Создаёт пустое окно на size замеров."""
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Добавляет длительность запроса."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Возвращает квантиль q или None, если замеров мало."""
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class HedgedCaller:
+    """
+    Выполняет блокирующий запрос с общим дедлайном.
+    При включённом хеджировании, если ответа нет дольше p95 прошлых
+    запросов, отправляет дублирующий запрос; побеждает первый успешный.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS,
+                 tracker: LatencyTracker = None) -> None:
+        """Создаёт пул потоков для запросов."""
+        self.tracker = tracker or LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='api')
+        self.hedges = 0
+
+    def hedge_delay(self) -> float:
+        """Задержка перед дублирующим запросом по p95 длительностей."""
+        p95 = self.tracker.quantile(HEDGE_QUANTILE)
+        if p95 is None:
+            return DEFAULT_HEDGE_DELAY
+        return max(p95, MIN_HEDGE_DELAY)
+
+    def _timed(self, function: Callable[[], T]) -> T:
+        started = time.monotonic()
+        result = function()
+        self.tracker.record(time.monotonic() - started)
+        return result
+
+    def call(self, function: Callable[[], T], deadline: float,
+             hedge: bool = False) -> T:
+        """
+        Возвращает результат function не позже чем через deadline секунд.
+        По истечении дедлайна выбрасывает TimeoutError.
+        """
+        expires = time.monotonic() + deadline
+        pending = {self._executor.submit(self._timed, function)}
+        if hedge:
+            done, _ = wait(pending, timeout=min(self.hedge_delay(), deadline))
+            if not done:
+                self.hedges += 1
+                logging.debug('Ответ API задерживается, '
+                              'отправлен дублирующий запрос')
+                pending.add(self._executor.submit(self._timed, function))
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return _cancel_others(future, pending)
+        if error is not None and not pending:
+            raise error
+        for future in pending:
+            future.cancel()
+        raise TimeoutError(f'нет ответа за {deadline} с')
+
+
+def _cancel_others(winner: Future, pending: set[Future]):
+    for future in pending:
+        future.cancel()
+    return winner.result()
@@ -1,26 +1,72 @@
+from __future__ import annotations
+
 import json
 import logging
 import os
 import sys
 import time
+from functools import partial
 from http import HTTPStatus
+from typing import NamedTuple, Optional
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import circuit_breaker
+import digest
+import error_dedupe
+import fanout
+import fastjson
+import hedging
+import lazy_import
+import leases
+import metrics
+import outbox
+import polling_policy
+import profiling
+import schema
+import shutdown
+import state_store
+import tenants
+from exceptions import CurrentDateError, ShutdownRequested
 
-from dotenv import load_dotenv
-import requests
-import telegram
+requests = lazy_import.lazy_module('requests')
+telegram = lazy_import.lazy_module('telegram')
+http_session = lazy_import.lazy_module('http_session')
 
-from exceptions import CurrentDateError
+SETTINGS = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
 
 
-load_dotenv()
+def load_settings() -> None:
+    """
+    Читает .env и токены при первом обращении к ним.
+    Значения, уже заданные в модуле, не перезаписываются.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, HEADERS
+    settings = globals()
+    if 'HEADERS' in settings:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    for name in SETTINGS:
+        settings.setdefault(name, os.getenv(name))
+    HEADERS = {'Authorization': f'OAuth {settings["PRACTICUM_TOKEN"]}'}
 
-PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
-TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+
+def __getattr__(name: str):
+    """Загружает токены при первом обращении к ним извне модуля."""
+    if name in (*SETTINGS, 'HEADERS'):
+        load_settings()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+if __name__ == '__main__':
+    load_settings()
 
 RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
 
 HOMEWORK_VERDICTS = {
@@ -31,6 +77,77 @@ HOMEWORK_VERDICTS = {
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE_PATH = os.path.join(SCRIPT_DIR, 'logging_bot.log')
+LOG_TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+STATE_DB_PATH = os.getenv('STATE_DB_PATH',
+                          os.path.join(SCRIPT_DIR, 'bot_state.sqlite3'))
+OUTBOX_PATH = os.getenv('OUTBOX_PATH',
+                        os.path.join(SCRIPT_DIR, 'outbox.jsonl'))
+DEFAULT_TENANT = 'default'
+CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 10))
+POLL_DEADLINE = float(os.getenv('API_POLL_DEADLINE', 15))
+HEDGE_REQUESTS = os.getenv('API_HEDGE_REQUESTS', '').lower() in ('1', 'true')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', 1))
+BREAKER_STATES = {circuit_breaker.CLOSED: 0, circuit_breaker.HALF_OPEN: 1,
+                  circuit_breaker.OPEN: 2}
+
+RESPONSE_SCHEMA = schema.Schema('Ответ API должен быть в виде словаря', (
+    schema.Rule('homeworks', KeyError,
+                'Отсутствует ключ "homeworks" в ответе API',
+                expected=list,
+                type_message=('Значение ключа "homeworks" должно быть '
+                              'представлено в виде списка'),
+                none_is_missing=True),
+    schema.Rule('current_date', CurrentDateError,
+                'Отсутствует ключ "current_date" в ответе API',
+                expected=int, type_error=CurrentDateError,
+                type_message=('Значение ключа current_date должно'
+                              'быть представлено в виде списка')),
+))
+HOMEWORK_SCHEMA = schema.Schema('Полученный аргумент должен быть словарем.', (
+    schema.Rule('status', KeyError,
+                'Нет ключа "status" в словаре домашней работы.',
+                choices=HOMEWORK_VERDICTS,
+                choice_message=('Статус {value} не найден в '
+                                'HOMEWORK_VERDICTS.')),
+    schema.Rule('homework_name', KeyError,
+                'Нет ключа "homework_name" в словаре домашней работы.'),
+))
+
+api_caller = hedging.HedgedCaller()
+error_filter = error_dedupe.ErrorDeduplicator()
+
+
+def http_stat(name: str) -> int:
+    """Возвращает счётчик общей HTTP-сессии или 0 без сессии."""
+    session = http_session.installed()
+    return session.stats()[name] if session else 0
+
+
+metrics.gauge('bot_outbox_pending', 'Неподтверждённые сообщения журнала.',
+              lambda: len(outbox.current()))
+metrics.gauge('bot_api_breaker_state',
+              'Предохранитель API: 0 закрыт, 1 пробный, 2 открыт.',
+              lambda: BREAKER_STATES[
+                  circuit_breaker.breaker_for(ENDPOINT).stats()['state']])
+metrics.counter('bot_api_breaker_rejected_total',
+                'Запросы, отклонённые открытым предохранителем.',
+                lambda: circuit_breaker.breaker_for(ENDPOINT).stats()[
+                    'rejected'])
+metrics.counter('bot_api_hedged_requests_total',
+                'Дублирующие запросы к API.', lambda: api_caller.hedges)
+metrics.counter('bot_http_new_connections_total',
+                'Новые HTTP-соединения общей сессии.',
+                lambda: http_stat('new_connections'))
+metrics.counter('bot_http_reused_connections_total',
+                'Запросы по уже открытым HTTP-соединениям.',
+                lambda: http_stat('reused_connections'))
+metrics.counter('bot_errors_suppressed_total',
+                'Повторы ошибок, не отправленные в Telegram.',
+                lambda: error_filter.suppressed)
 
 
 def check_tokens() -> list[str]:
@@ -38,6 +155,7 @@ def check_tokens() -> list[str]:
     Проверяем доступность переменных окружения.
     И возвращаем список отсутствующих.
     """
+    load_settings()
     required_tokens = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
     missing_tokens = [token_name for token_name in required_tokens
                       if not globals().get(token_name)]
@@ -48,79 +166,273 @@ def check_tokens() -> list[str]:
         sys.exit(1)
 
 
+def target_chat() -> str:
+    """Возвращает чат текущего сообщения: подписчика или студента."""
+    load_settings()
+    tenant = tenants.current()
+    return tenants.current_chat() or (
+        tenant.chat_id if tenant else TELEGRAM_CHAT_ID
+    )
+
+
+@metrics.timed('send_message')
 def send_message(bot: telegram.Bot, message: str) -> bool:
-    """Отправляет сообщение в Telegram чат."""
+    """
+    Отправляет сообщение в Telegram чат.
+    Возвращает True, если Telegram принял сообщение.
+    """
+    chat_id = target_chat()
+    started = time.perf_counter()
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message,)
+        bot.send_message(chat_id, message,)
     except telegram.TelegramError as error:
-        logging.error(f"Ошибка при отправке сообщения в Telegram: {error}")
-    else:
-        logging.debug('Статус отправлен в telegram')
+        logging.error(f"Ошибка при отправке сообщения в Telegram: {error}",
+                      extra={'stage': 'send_message'})
+        return False
+    logging.debug('Статус отправлен в telegram',
+                  extra={'event': 'message_sent', 'stage': 'send_message',
+                         'duration': time.perf_counter() - started})
+    return True
 
 
+@metrics.timed('get_api_answer')
 def get_api_answer(timestamp: int) -> dict:
     """Отправляет запрос к API-сервису и возвращает ответ."""
+    load_settings()
     payload = {'from_date': timestamp}
+    tenant = tenants.current()
+    headers = tenant.headers if tenant else HEADERS
+    session = http_session.installed()
+    http_get = session.get if session else requests.get
+    request = partial(http_get, ENDPOINT, headers=headers, params=payload,
+                      timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    breaker = circuit_breaker.breaker_for(ENDPOINT)
+    breaker.before_call()
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=payload)
-        if response.status_code != HTTPStatus.OK:
-            raise RuntimeError(f'Код ответа: {response.status_code}')
-        return response.json()
+        response = api_caller.call(request, deadline=POLL_DEADLINE,
+                                   hedge=HEDGE_REQUESTS)
     except requests.RequestException as error:
+        breaker.record_failure()
         raise RuntimeError(f'Произошла ошибка при запросе к API: {error}')
+    except TimeoutError as error:
+        breaker.record_failure()
+        raise RuntimeError(f'Превышено время ожидания ответа API: {error}')
+    breaker.record(response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR)
+    if response.status_code != HTTPStatus.OK:
+        raise RuntimeError(f'Код ответа: {response.status_code}')
+    try:
+        return fastjson.decode(response)
     except json.JSONDecodeError as decode_error:
         raise RuntimeError(f'Ошибка при парсинге JSON данных: {decode_error}')
 
 
+@metrics.timed('check_response')
 def check_response(response: dict) -> list:
     """Проверяет ответ API на соответствие документации."""
-    if not isinstance(response, dict):
-        raise TypeError('Ответ API должен быть в виде словаря')
-    homeworks = response.get('homeworks')
-    if homeworks is None:
-        raise KeyError('Отсутствует ключ "homeworks" в ответе API')
-    if not isinstance(homeworks, list):
-        raise TypeError('Значение ключа "homeworks" должно быть '
-                        'представлено в виде списка')
-    if 'current_date' not in response:
-        message = 'Отсутствует ключ "current_date" в ответе API'
-        raise CurrentDateError(message)
-    if not isinstance(response['current_date'], int):
-        message = ('Значение ключа current_date должно'
-                   'быть представлено в виде списка')
-        raise CurrentDateError(message)
-    return homeworks
+    return RESPONSE_SCHEMA.validate(response)['homeworks']
 
 
+@metrics.timed('parse_status')
 def parse_status(homework: dict) -> str:
     """Извлекает статус, возвращает в Telegram строку статуса."""
-    if not isinstance(homework, dict):
-        raise TypeError('Полученный аргумент должен быть словарем.')
-    status = homework.get('status')
-    if 'status' not in homework:
-        message = 'Нет ключа "status" в словаре домашней работы.'
-        raise KeyError(message)
-    verdict = HOMEWORK_VERDICTS.get(status)
-    if verdict is None:
-        message = f'Статус {status} не найден в HOMEWORK_VERDICTS.'
-        raise ValueError(message)
-    name = homework.get('homework_name')
-    if 'homework_name' not in homework:
-        message = 'Нет ключа "homework_name" в словаре домашней работы.'
-        raise KeyError(message)
+    HOMEWORK_SCHEMA.validate(homework)
+    verdict = HOMEWORK_VERDICTS[homework['status']]
+    name = homework['homework_name']
     return f'Изменился статус проверки работы "{name}". {verdict}'
 
 
-def send_unique_message(bot: telegram.Bot, message: str,
-                        last_message: str) -> str:
+def tenant_name() -> str:
+    """Возвращает имя текущего студента для ключей состояния."""
+    tenant = tenants.current()
+    return tenant.name if tenant else DEFAULT_TENANT
+
+
+def homework_key(homework: dict) -> Optional[str]:
+    """Возвращает ключ работы: id, а при его отсутствии название."""
+    if 'id' in homework:
+        return str(homework['id'])
+    return homework.get('homework_name')
+
+
+def subscribers() -> list[str]:
+    """Возвращает чаты, подписанные на уведомления текущего студента."""
+    load_settings()
+    tenant = tenants.current()
+    own_chat = str(tenant.chat_id if tenant else TELEGRAM_CHAT_ID)
+    return [chat_id for chat_id
+            in state_store.current().get_subscriptions(tenant_name())
+            if chat_id != own_chat]
+
+
+def post_message(bot: telegram.Bot, message: str) -> bool:
     """
-    Отправляет уникальное сообщение только если оно.
-    отличается от последнего отправленного.
+    Отправляет сообщение или ставит его в очередь отправки бота.
+    Поставленное в очередь сообщение замеряется и попадает в журнал
+    только при настоящей отправке.
     """
-    if last_message != message:
-        send_message(bot, message)
-        return message
-    return last_message
+    if getattr(bot, 'deferred', False):
+        bot.send_message(target_chat(), message)
+        return True
+    return send_message(bot, message)
+
+
+def attempt_delivery(bot: telegram.Bot, entries: list[outbox.Entry],
+                     message: str) -> bool:
+    """Отправляет сообщение в чат записей журнала и отмечает их исход."""
+    with tenants.addressed(entries[0].chat_id):
+        return outbox.current().attempt_all(
+            entries, partial(post_message, bot, message)
+        )
+
+
+def deliver(bot: telegram.Bot, message: str, urgent: bool = False,
+            key: Optional[str] = None, fan_out: bool = True) -> bool:
+    """
+    Записывает сообщение в журнал исходящих и отправляет его.
+    Сообщение один раз записывается для студента и каждого подписчика
+    и рассылается по их чатам параллельно; без fan_out оно уходит
+    только студенту. Недоставленное сообщение остаётся в журнале
+    и отправляется повторно.
+    В режиме сводки несрочное сообщение откладывается на digest.WINDOW
+    секунд и уходит одним сообщением с остальными изменениями студента,
+    а если сводка перестаёт помещаться в сообщение, уходит досрочно.
+    Срочное сообщение о работе key снимает отложенные сообщения о ней,
+    чтобы старый статус не пришёл в сводке после нового.
+    """
+    box = outbox.current()
+    name = tenant_name()
+    chats = [None, *subscribers()] if fan_out else [None]
+    if digest.WINDOW and urgent and key is not None:
+        box.supersede(name, key)
+    if digest.WINDOW and not urgent:
+        for chat_id in chats:
+            box.add(name, message, delay=digest.WINDOW, chat_id=chat_id,
+                    key=key)
+        texts = [entry.text for entry in box.buffered(name)
+                 if entry.chat_id is None]
+        if not digest.fits(texts):
+            box.release(name)
+        return True
+    entries = [box.add(name, message, chat_id=chat_id) for chat_id in chats]
+    return all(fanout.run_all([partial(attempt_delivery, bot, [entry],
+                                       message) for entry in entries]))
+
+
+def _retry_chat(bot: telegram.Bot, entries: list[outbox.Entry]) -> None:
+    groups = (digest.batches(entries) if digest.WINDOW
+              else [[entry] for entry in entries])
+    for group in groups:
+        attempt_delivery(bot, group,
+                         digest.render([entry.text for entry in group]))
+
+
+def retry_undelivered(bot: telegram.Bot) -> None:
+    """
+    Повторяет отправку сообщений, которым подошёл срок повтора.
+    Чаты обрабатываются параллельно, сообщения одного чата — по порядку.
+    В режиме сводки они объединяются в сообщения до 4096 символов.
+    """
+    by_chat: dict[Optional[str], list[outbox.Entry]] = {}
+    for entry in outbox.current().due(tenant_name()):
+        by_chat.setdefault(entry.chat_id, []).append(entry)
+    fanout.run_all([partial(_retry_chat, bot, entries)
+                    for entries in by_chat.values()])
+
+
+def notify_statuses(bot: telegram.Bot, homeworks: list) -> None:
+    """
+    Отправляет уведомления по всем работам, чей статус изменился.
+    Статус попадает в индекс, как только сообщение записано в журнал
+    исходящих: дальше за доставку отвечает журнал.
+    Работа, которую не удалось разобрать, отправляется в отчёт об ошибке
+    и пропускается, не мешая уведомлениям по остальным работам.
+    """
+    index = state_store.current().status_index(tenant_name())
+    for homework in index.transitions(homeworks, key=homework_key):
+        try:
+            message = parse_status(homework)
+        except (KeyError, TypeError, ValueError) as error:
+            report_error(bot, f'Сбой в разборе домашней работы: {error}')
+            continue
+        deliver(bot, message, urgent=digest.is_urgent(homework['status']),
+                key=homework_key(homework))
+        index.mark(homework_key(homework), homework['status'])
+        logging.info(f'Новый статус работы: {homework["status"]}',
+                     extra={'event': 'status_changed', 'stage': 'notify',
+                            'homework': homework_key(homework)})
+
+
+class CycleResult(NamedTuple):
+    """Итог цикла опроса: новая метка времени и исход."""
+
+    timestamp: int
+    outcome: str
+
+
+def report_error(bot: telegram.Bot, message: str) -> bool:
+    """
+    Сообщает в Telegram о сбое, подавляя повторы той же ошибки.
+    Сбой уходит только в чат студента, без подписчиков.
+    Возвращает True, если сообщение отправлено.
+    """
+    logging.error(message)
+    text = error_filter.check(tenant_name(), message)
+    if text is None:
+        logging.debug('Повтор ошибки не отправлен в Telegram')
+        return False
+    deliver(bot, text, urgent=True, fan_out=False)
+    return True
+
+
+def resume_tenant(timestamp: int) -> int:
+    """
+    Перечитывает состояние студента, которого опрашивала другая реплика.
+    Неотправленные сообщения студента переносятся из журналов исходящих
+    других шардов и реплик. Возвращает сохранённый current_date или
+    прежний timestamp.
+    """
+    store = state_store.current()
+    store.reload(tenant_name())
+    outbox.current().reload(tenant_name())
+    cursor = store.get_cursor(tenant_name())
+    return timestamp if cursor is None else cursor
+
+
+def poll_cycle(bot: telegram.Bot, timestamp: int) -> CycleResult:
+    """
+    Выполняет один цикл опроса API и уведомления.
+    Исход цикла подсказывает политике опроса, когда повторить запрос.
+    """
+    outcome = polling_policy.ERROR
+    try:
+        retry_undelivered(bot)
+        response = get_api_answer(timestamp)
+        homeworks = check_response(response)
+        if not homeworks:
+            logging.debug("Домашних работ нет.",
+                          extra={'event': 'no_homeworks',
+                                 'stage': 'check_response'})
+        else:
+            notify_statuses(bot, homeworks)
+            if digest.WINDOW:
+                retry_undelivered(bot)
+        timestamp = response['current_date']
+        store = state_store.current()
+        store.set_cursor(tenant_name(), timestamp)
+        outcome = polling_policy.IDLE
+        if store.status_index(tenant_name()).has_status('reviewing'):
+            outcome = polling_policy.REVIEWING
+    except CurrentDateError as error:
+        logging.error(f'Ошибка в текущей дате в ответе API: {error}')
+    except Exception as error:
+        report_error(bot, f'Сбой в работе программы: {error}')
+    return CycleResult(timestamp, outcome)
+
+
+def retry_held(keeper: leases.LeaseKeeper, bot) -> None:
+    """Повторяет отправку, пока этот процесс держит аренду студента."""
+    if keeper.holds(DEFAULT_TENANT):
+        retry_undelivered(bot)
 
 
 def main():
@@ -131,34 +443,69 @@ def main():
         sys.exit()
 
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    last_message = ""
+    store = state_store.install(state_store.open_store(STATE_DB_PATH))
+    outbox.install(outbox.Outbox(OUTBOX_PATH))
+    timestamp = store.get_cursor(DEFAULT_TENANT)
+    if timestamp is None:
+        timestamp = int(time.time())
+    policy = polling_policy.PollPolicy(base=RETRY_PERIOD, jitter=0,
+                                       standby=leases.LEASE_TTL)
+    keeper = leases.LeaseKeeper(leases.open_backend(leases.LEASE_DB_PATH),
+                                [DEFAULT_TENANT]).start()
+    stop = shutdown.ShutdownSignal().install()
+    profiler = profiling.CycleProfiler(os.path.dirname(LOG_FILE_PATH))
+    profiler.install()
+    drainer = outbox.Drainer(partial(retry_held, keeper, bot)).start()
 
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            if not homeworks:
-                logging.debug("Домашних работ нет.")
-            else:
-                homework = homeworks[0]
-                message = parse_status(homework)
-                last_message = send_unique_message(bot, message, last_message)
-            timestamp = response['current_date']
-        except CurrentDateError as error:
-            logging.error(f'Ошибка в текущей дате в ответе API: {error}')
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            last_message = send_unique_message(bot, message, last_message)
-        finally:
-            time.sleep(RETRY_PERIOD)
+    try:
+        while True:
+            outcome = polling_policy.STANDBY
+            try:
+                if keeper.holds(DEFAULT_TENANT):
+                    outcome = polling_policy.ERROR
+                    if keeper.gained(DEFAULT_TENANT):
+                        timestamp = resume_tenant(timestamp)
+                    with profiler.cycle():
+                        timestamp, outcome = poll_cycle(bot, timestamp)
+                    store.flush()
+            finally:
+                delay = policy.next_delay(outcome)
+                with stop.interruptible():
+                    time.sleep(delay)
+    except ShutdownRequested:
+        logging.info(f'Получен сигнал {stop.signal}, бот останавливается')
+    finally:
+        stop.uninstall()
+        drainer.stop()
+        profiler.uninstall()
+        shutdown.finish()
+        keeper.stop()
 
 
-if __name__ == "__main__":
-    logging.basicConfig(
-        handlers=[logging.StreamHandler(stream=sys.stdout),
-                  logging.FileHandler(LOG_FILE_PATH)
-                  ],
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(message)s'
+def setup_logging(log_file: str = LOG_FILE_PATH) -> None:
+    """Настраивает фоновую запись журнала в stdout и файл log_file."""
+    import log_pipeline
+    log_writer = log_pipeline.start(
+        [log_pipeline.BatchedStreamHandler(stream=sys.stdout),
+         log_pipeline.SizeTimedRotatingFileHandler(log_file)],
+        log_pipeline.JsonFormatter() if LOG_FORMAT == 'json'
+        else logging.Formatter(LOG_TEXT_FORMAT),
+        filters=log_pipeline.configured_filters(tenant_name)
     )
+    logging.basicConfig(handlers=[log_writer.handler], level=logging.DEBUG)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    if TENANTS_FILE and WORKER_PROCESSES > 1:
+        import supervisor
+        supervisor.Supervisor(TENANTS_FILE, WORKER_PROCESSES).run()
+    else:
+        if METRICS_PORT:
+            metrics.serve(METRICS_PORT)
+        if TENANTS_FILE:
+            import engine
+            engine.run(TENANTS_FILE)
+        else:
+            http_session.install()
+            main()
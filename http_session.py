@@ -0,0 +1,140 @@
+import http.cookiejar
+import logging
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 4))
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 32))
+
+
+class ConnectionCounters:
+    """Счётчики запросов и открытых соединений пула."""
+
+    def __init__(self) -> None:
+        """Обнуляет счётчики."""
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def count_request(self) -> None:
+        """Учитывает отправленный запрос."""
+        with self._lock:
+            self.requests += 1
+
+    def count_connection(self) -> None:
+        """Учитывает новое TCP/TLS соединение."""
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> dict:
+        """Возвращает счётчики, в том числе число переиспользований."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': max(
+                    self.requests - self.new_connections, 0
+                ),
+            }
+
+
+def _counting_pool(base: type, counters: ConnectionCounters) -> type:
+    class CountingPool(base):
+        def _new_conn(self):
+            counters.count_connection()
+            return super()._new_conn()
+
+    CountingPool.__name__ = f'Counting{base.__name__}'
+    return CountingPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    Адаптер с пулом keep-alive соединений.
+    pool_maxsize ограничивает число соединений к одному хосту,
+    pool_connections — число хостов, для которых хранится пул.
+    """
+
+    def __init__(self, counters: ConnectionCounters, **kwargs) -> None:
+        """Сохраняет счётчики до инициализации пула соединений."""
+        self.counters = counters
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        """Подменяет классы пулов на считающие новые соединения."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.counters),
+            'https': _counting_pool(HTTPSConnectionPool, self.counters),
+        }
+
+    def send(self, request, **kwargs):
+        """Отправляет запрос, учитывая его в счётчиках."""
+        self.counters.count_request()
+        return super().send(request, **kwargs)
+
+
+class PooledSession(requests.Session):
+    """
+    Сессия requests с общим пулом соединений.
+    Сессия общая для всех студентов, поэтому cookies ответов
+    не сохраняются и не уходят с запросами других студентов.
+    """
+
+    def __init__(self, pool_connections: int = POOL_CONNECTIONS,
+                 pool_maxsize: int = POOL_MAXSIZE) -> None:
+        """Монтирует адаптер с пулом для http и https."""
+        super().__init__()
+        self.counters = ConnectionCounters()
+        adapter = PooledAdapter(self.counters,
+                                pool_connections=pool_connections,
+                                pool_maxsize=pool_maxsize,
+                                pool_block=True)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.cookies.set_policy(
+            http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+        )
+
+    def stats(self) -> dict:
+        """Возвращает статистику переиспользования соединений."""
+        return self.counters.snapshot()
+
+
+_session: Optional[PooledSession] = None
+_session_lock = threading.Lock()
+
+
+def install(pool_connections: int = POOL_CONNECTIONS,
+            pool_maxsize: int = POOL_MAXSIZE) -> PooledSession:
+    """
+    Создаёт общую для всех опросов сессию, если её ещё нет.
+    Повторный вызов возвращает уже установленную сессию.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = PooledSession(pool_connections, pool_maxsize)
+            logging.debug(f'Создан пул HTTP-соединений на {pool_maxsize} '
+                          f'соединений к хосту')
+        return _session
+
+
+def installed() -> Optional[PooledSession]:
+    """Возвращает общую сессию или None, если она не установлена."""
+    return _session
+
+
+def uninstall() -> None:
+    """Закрывает общую сессию и её соединения."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            logging.debug(f'Статистика HTTP-соединений: {_session.stats()}')
+            _session.close()
+            _session = None
@@ -0,0 +1,107 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = ' \t\n\r'
+_DECODER = json.JSONDecoder()
+
+
+class _Reader:
+    """Текст JSON, который дочитывается из потока байтов по мере разбора."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        while not self.eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                text = self._decoder.decode(b'', final=True)
+                self.eof = True
+            else:
+                text = self._decoder.decode(chunk)
+            if text:
+                self.buffer = self.buffer[self.pos:] + text
+                self.pos = 0
+                return True
+        return False
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buffer, self.pos)
+
+    def peek(self) -> str:
+        while True:
+            buffer, pos = self.buffer, self.pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return ''
+
+    def take(self, expected: str) -> str:
+        char = self.peek()
+        if char not in expected:
+            raise self.error(f'Ожидался один из символов {expected!r}')
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+class ArrayStream:
+    """
+    Потоковый разбор массива key из JSON-объекта верхнего уровня.
+    Элементы массива отдаются по одному, в памяти держится только
+    текущий элемент и непрочитанный остаток куска. Остальные поля
+    объекта после разбора лежат в fields.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], key: str) -> None:
+        """Готовит разбор потока байтов chunks."""
+        self.key = key
+        self.found = False
+        self.fields: dict[str, Any] = {}
+        self._reader = _Reader(chunks)
+
+    def __iter__(self) -> Iterator[Any]:
+        """Отдаёт элементы массива по мере чтения потока."""
+        reader = self._reader
+        reader.take('{')
+        if reader.peek() == '}':
+            reader.pos += 1
+            return
+        while True:
+            name = reader.value()
+            reader.take(':')
+            if name == self.key and reader.peek() == '[':
+                self.found = True
+                reader.pos += 1
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.take(',]') == ']':
+                            break
+            else:
+                self.fields[name] = reader.value()
+            if reader.take(',}') == '}':
+                return
@@ -0,0 +1,218 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+LEASE_TTL = float(os.getenv('LEASE_TTL', 5))
+LEASE_DB_PATH = os.getenv('LEASE_DB_PATH')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    resource TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class LeaseBackend:
+    """
+    Хранилище аренды ресурсов.
+    Базовая реализация держит аренду в памяти и годится для одного
+    процесса; общее хранилище для нескольких реплик переопределяет
+    acquire и release.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        """Создаёт пустое хранилище."""
+        self._clock = clock
+        self._leases: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, resources: Iterable[str], owner: str,
+                ttl: float) -> set[str]:
+        """
+        Захватывает свободные и продлевает свои аренды на ttl секунд.
+        Возвращает ресурсы, которые теперь принадлежат owner.
+        """
+        held = set()
+        with self._lock:
+            now = self._clock()
+            for resource in resources:
+                current, expires = self._leases.get(resource, (owner, 0))
+                if current == owner or expires <= now:
+                    self._leases[resource] = (owner, now + ttl)
+                    held.add(resource)
+        return held
+
+    def release(self, resources: Iterable[str], owner: str) -> None:
+        """Освобождает аренды owner, чтобы их сразу могла взять реплика."""
+        with self._lock:
+            for resource in resources:
+                if self._leases.get(resource, (None,))[0] == owner:
+                    del self._leases[resource]
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища."""
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """
+    Аренда в файле SQLite, общем для реплик на одной машине.
+    Захват и продление всех ресурсов выполняются одной транзакцией.
+    """
+
+    def __init__(self, path: str,
+                 clock: Callable[[], float] = time.time) -> None:
+        """Открывает базу и создаёт таблицу, если её нет."""
+        super().__init__(clock)
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def acquire(self, resources: Iterable[str], owner: str,
+                ttl: float) -> set[str]:
+        """Захватывает и продлевает аренды одной транзакцией."""
+        resources = list(resources)
+        with self._lock:
+            now = self._clock()
+            connection = self._connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.executemany(
+                    'INSERT INTO leases VALUES (?, ?, ?) '
+                    'ON CONFLICT (resource) DO UPDATE '
+                    'SET owner = excluded.owner, expires = excluded.expires '
+                    'WHERE leases.owner = excluded.owner '
+                    'OR leases.expires <= ?',
+                    [(resource, owner, now + ttl, now)
+                     for resource in resources]
+                )
+                rows = connection.execute(
+                    'SELECT resource FROM leases WHERE owner = ?', (owner,)
+                ).fetchall()
+            except sqlite3.Error:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        return {resource for resource, in rows}.intersection(resources)
+
+    def release(self, resources: Iterable[str], owner: str) -> None:
+        """Удаляет аренды owner из базы."""
+        with self._lock:
+            self._connection.executemany(
+                'DELETE FROM leases WHERE resource = ? AND owner = ?',
+                [(resource, owner) for resource in resources]
+            )
+
+    def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._connection.close()
+
+
+def open_backend(path: Optional[str]) -> LeaseBackend:
+    """Открывает хранилище аренды: SQLite по пути или память для None."""
+    if not path:
+        return LeaseBackend()
+    return SQLiteLeaseBackend(path)
+
+
+def replica_id() -> str:
+    """Возвращает имя реплики: хост и номер процесса."""
+    import socket
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class LeaseKeeper:
+    """
+    Удерживает аренду студентов, которых опрашивает эта реплика.
+    Фоновый поток каждые ttl/3 секунд продлевает свои аренды и
+    захватывает освободившиеся, поэтому после падения реплики её
+    студентов за несколько секунд подхватывает другая. Аренда считается
+    своей до момента, посчитанного до запроса к хранилищу, поэтому
+    реплика перестаёт опрашивать раньше, чем аренду сможет взять другая.
+    """
+
+    def __init__(self, backend: LeaseBackend, resources: Iterable[str],
+                 owner: Optional[str] = None, ttl: float = LEASE_TTL,
+                 clock: Callable[[], float] = time.time) -> None:
+        """Готовит аренду; поток продления запускает start."""
+        self.backend = backend
+        self.resources = list(resources)
+        self.owner = owner or replica_id()
+        self.ttl = ttl
+        self._clock = clock
+        self._held: dict[str, float] = {}
+        self._gained: set[str] = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> set[str]:
+        """Продлевает и захватывает аренды; возвращает удержанные."""
+        started = self._clock()
+        try:
+            held = self.backend.acquire(self.resources, self.owner,
+                                        self.ttl)
+        except Exception as error:
+            logging.error(f'Не удалось продлить аренду студентов: {error}')
+            return set(self._held)
+        with self._lock:
+            gained = held.difference(self._held)
+            lost = set(self._held).difference(held)
+            self._held = dict.fromkeys(held, started + self.ttl)
+            self._gained.update(gained)
+            self._gained.difference_update(lost)
+        if gained:
+            logging.info(f'Реплика {self.owner} получила студентов: '
+                         f'{len(gained)}')
+        if lost:
+            logging.warning(f'Реплика {self.owner} потеряла студентов: '
+                            f'{len(lost)}')
+        return held
+
+    def holds(self, resource: str) -> bool:
+        """Проверяет, что аренда ресурса принадлежит реплике."""
+        expires = self._held.get(resource)
+        return expires is not None and self._clock() < expires
+
+    def gained(self, resource: str) -> bool:
+        """
+        Возвращает True один раз после захвата аренды ресурса.
+        Новый владелец должен перечитать состояние студента из хранилища.
+        """
+        with self._lock:
+            if resource in self._gained:
+                self._gained.discard(resource)
+                return True
+            return False
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.ttl / 3):
+            self.refresh()
+
+    def start(self) -> 'LeaseKeeper':
+        """Захватывает аренды и запускает поток продления."""
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='leases')
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает продление и освобождает аренды."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            held, self._held = list(self._held), {}
+        try:
+            self.backend.release(held, self.owner)
+        except Exception as error:
+            logging.error(f'Не удалось освободить аренду студентов: {error}')
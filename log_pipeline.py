@@ -0,0 +1,346 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Optional
+
+QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 2 ** 20))
+BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 7))
+ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+SAMPLING = os.getenv('LOG_SAMPLING', '')
+REPEAT_INTERVAL = float(os.getenv('LOG_REPEAT_INTERVAL', 0))
+REPEAT_TABLE_SIZE = 4096
+JSON_FIELDS = ('tenant', 'homework', 'stage', 'duration', 'event',
+               'sampled', 'repeated')
+
+_STOP = object()
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Обработчик, который только кладёт запись в ограниченную очередь.
+    При переполнении записи ниже WARNING отбрасываются, а более важные
+    вытесняют самую старую запись очереди; потери считает dropped.
+    """
+
+    def __init__(self, maxsize: int = QUEUE_SIZE) -> None:
+        """Создаёт очередь на maxsize записей."""
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Возвращает запись без изменений.
+        Записи не покидают процесс, поэтому форматирование переносится
+        в фоновый поток.
+        """
+        return record
+
+    def _count_drop(self) -> None:
+        with self._drop_lock:
+            self.dropped += 1
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Кладёт запись в очередь, не блокируя вызывающий поток."""
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno < logging.WARNING:
+            self._count_drop()
+            return
+        try:
+            self.queue.get_nowait()
+            self._count_drop()
+            self.queue.put_nowait(record)
+        except (queue.Empty, queue.Full):
+            self._count_drop()
+
+
+class _BatchFlushMixin:
+    """Откладывает сброс буфера потока до конца пачки записей."""
+
+    def flush(self) -> None:
+        """Не сбрасывает буфер после каждой записи."""
+
+    def flush_batch(self) -> None:
+        """Сбрасывает буфер потока."""
+        super().flush()
+
+    def close(self) -> None:
+        """Сбрасывает буфер и закрывает поток."""
+        self.flush_batch()
+        super().close()
+
+
+class BatchedStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    """Вывод в поток со сбросом буфера пачками."""
+
+
+class SizeTimedRotatingFileHandler(
+        _BatchFlushMixin, logging.handlers.TimedRotatingFileHandler
+):
+    """
+    Файловый журнал с ротацией по времени и по размеру.
+    Архивы одного периода получают номера: logging_bot.log.2024-01-01,
+    logging_bot.log.2024-01-01.1 и так далее.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = MAX_BYTES,
+                 when: str = ROTATE_WHEN,
+                 backup_count: int = BACKUP_COUNT, **kwargs) -> None:
+        """Открывает журнал; max_bytes=0 отключает ротацию по размеру."""
+        super().__init__(filename, when=when, backupCount=backup_count,
+                         encoding='utf-8', **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """Проверяет, наступил ли новый период или превышен размер."""
+        if super().shouldRollover(record):
+            return True
+        if not self.max_bytes:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        message = f'{self.format(record)}\n'
+        return self.stream.tell() + len(message) >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        """Подбирает свободное имя архива, чтобы не затереть прежний."""
+        name, number = default_name, 0
+        while os.path.exists(name):
+            number += 1
+            name = f'{default_name}.{number}'
+        return super().rotation_filename(name)
+
+
+class LogWriter:
+    """
+    Фоновый поток, который пишет записи из очереди в обработчики.
+    Буферы сбрасываются пачкой: после batch_size записей, не позже чем
+    через flush_interval секунд и сразу после записи уровня ERROR.
+    Пачками сбрасывают буфер BatchedStreamHandler и
+    SizeTimedRotatingFileHandler, остальные обработчики — как обычно.
+    """
+
+    def __init__(self, handlers: Iterable[logging.Handler],
+                 queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL) -> None:
+        """Готовит очередь и обработчики; поток запускает start."""
+        self.handler = BoundedQueueHandler(queue_size)
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reported_drops = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def _flush(self) -> None:
+        dropped = self.handler.dropped
+        if dropped > self._reported_drops:
+            record = logging.makeLogRecord({
+                'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'Пропущено записей журнала: '
+                       f'{dropped - self._reported_drops}',
+            })
+            self._reported_drops = dropped
+            self._handle(record)
+        for handler in self.handlers:
+            getattr(handler, 'flush_batch', handler.flush)()
+
+    def _handle(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _run(self) -> None:
+        pending = 0
+        deadline = 0.0
+        while True:
+            timeout = max(deadline - time.monotonic(), 0) if pending else None
+            try:
+                record = self.handler.queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            if record is _STOP:
+                self._flush()
+                return
+            if record is not None:
+                self._handle(record)
+                pending += 1
+                if pending == 1:
+                    deadline = time.monotonic() + self.flush_interval
+            if pending and (pending >= self.batch_size
+                            or time.monotonic() >= deadline
+                            or (record is not None
+                                and record.levelno >= logging.ERROR)):
+                self._flush()
+                pending = 0
+
+    def start(self) -> 'LogWriter':
+        """Запускает фоновый поток записи."""
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='log-writer')
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self) -> None:
+        """Дописывает очередь, сбрасывает буферы и закрывает обработчики."""
+        if self._thread is None:
+            return
+        self.handler.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+
+def parse_sampling(spec: str) -> dict[str, float]:
+    """Разбирает строку вида 'no_homeworks=0.01,message_sent=0.1'."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        event, _, rate = item.partition('=')
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи имя студента в потоке, который её создал."""
+
+    def __init__(self, tenant: Callable[[], str]) -> None:
+        """Запоминает функцию, возвращающую имя текущего студента."""
+        super().__init__()
+        self.tenant = tenant
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Заполняет поле tenant, если его не передали явно."""
+        if not hasattr(record, 'tenant'):
+            record.tenant = self.tenant()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю записей каждого типа event.
+    Выборка детерминированная: из каждых 1/rate записей типа проходит
+    первая, а поле sampled хранит долю для пересчёта при анализе.
+    Записи без event и уровня WARNING и выше проходят всегда.
+    """
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        """Запоминает доли записей по типам."""
+        super().__init__()
+        self.periods = {event: max(round(1 / rate), 1) if rate > 0 else 0
+                        for event, rate in rates.items()}
+        self.rates = rates
+        self._seen: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Решает, попадёт ли запись в выборку."""
+        event = getattr(record, 'event', None)
+        period = self.periods.get(event)
+        if period is None or record.levelno >= logging.WARNING:
+            return True
+        if not period:
+            return False
+        with self._lock:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+        record.sampled = self.rates[event]
+        return seen % period == 0
+
+
+class RepeatFilter(logging.Filter):
+    """
+    Подавляет одинаковые записи одного студента чаще раза в interval.
+    Первая запись после паузы получает поле repeated с числом
+    подавленных повторов.
+    """
+
+    def __init__(self, interval: float,
+                 max_size: int = REPEAT_TABLE_SIZE,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт пустую таблицу недавних записей."""
+        super().__init__()
+        self.interval = interval
+        self.max_size = max_size
+        self._clock = clock
+        self._seen: OrderedDict[tuple, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Пропускает запись, если такой не было последние interval с."""
+        key = (getattr(record, 'tenant', None), record.levelno,
+               record.getMessage())
+        now = self._clock()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.interval:
+                seen[1] += 1
+                return False
+            self._seen[key] = [now, 0]
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+        if seen is not None and seen[1]:
+            record.repeated = seen[1]
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну строку JSON с полями контекста."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Возвращает запись в виде JSON."""
+        event = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for field in JSON_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                event[field] = value
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def configured_filters(tenant: Callable[[], str]) -> list[logging.Filter]:
+    """Возвращает фильтры, заданные переменными окружения."""
+    filters = [ContextFilter(tenant)]
+    if SAMPLING:
+        filters.append(SamplingFilter(parse_sampling(SAMPLING)))
+    if REPEAT_INTERVAL:
+        filters.append(RepeatFilter(REPEAT_INTERVAL))
+    return filters
+
+
+def start(handlers: Iterable[logging.Handler], formatter: logging.Formatter,
+          filters: Iterable[logging.Filter] = (), **kwargs) -> LogWriter:
+    """
+    Назначает обработчикам формат и запускает фоновую запись.
+    Фильтры выполняются в потоке, создавшем запись, до постановки в
+    очередь. Возвращает писателя, чей handler подключается к корневому
+    логгеру.
+    """
+    handlers = list(handlers)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    writer = LogWriter(handlers, **kwargs)
+    for log_filter in filters:
+        writer.handler.addFilter(log_filter)
+    return writer.start()
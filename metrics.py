@@ -0,0 +1,292 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"'
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return (str(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+class _Metric(ABC):
+    kind = ''
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Возвращает дочернюю метрику для значений меток."""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        pass
+
+    def render(self) -> list[str]:
+        """Возвращает строки метрики в текстовом формате Prometheus."""
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: tuple, child) -> list[str]:
+        labels = _format_labels(self.labelnames, values)
+        return [f'{self.name}{labels} {child.value}']
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Увеличивает счётчик без меток."""
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и уменьшаться."""
+
+    kind = 'gauge'
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        """Устанавливает значение без меток."""
+        self.labels().set(value)
+
+
+class CallbackGauge(_Metric):
+    """Значение, которое вычисляется только в момент чтения метрик."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str,
+                 callback: Callable[[], float]) -> None:
+        """Запоминает функцию, возвращающую текущее значение."""
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def render(self) -> list[str]:
+        """Вызывает функцию и возвращает строки метрики."""
+        try:
+            value = float(self.callback())
+        except Exception as error:
+            logging.debug(f'Не удалось получить метрику {self.name}: {error}')
+            return []
+        return [f'# HELP {self.name} {self.documentation}',
+                f'# TYPE {self.name} {self.kind}',
+                f'{self.name} {value}']
+
+
+class CallbackCounter(CallbackGauge):
+    """Счётчик, значение которого вычисляется только в момент чтения."""
+
+    kind = 'counter'
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Распределение значений по фиксированным корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Iterable[str] = (),
+                 buckets: tuple = LATENCY_BUCKETS) -> None:
+        """Создаёт гистограмму с заданными верхними границами корзин."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Добавляет значение без меток."""
+        self.labels().observe(value)
+
+    def _render_child(self, values: tuple, child) -> list[str]:
+        lines = []
+        cumulative = 0
+        bounds = [*map(repr, self.buckets), '+Inf']
+        for bound, count in zip(bounds, child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {child.sum}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self) -> None:
+        """Создаёт пустой набор."""
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Добавляет метрику, заменяя одноимённую."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    'bot_stage_duration_seconds', 'Длительность этапов конвейера опроса.',
+    ('stage',)
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    'bot_stage_errors_total', 'Исключения этапов конвейера по типам.',
+    ('stage', 'exception')
+))
+
+
+def gauge(name: str, documentation: str,
+          callback: Callable[[], float]) -> CallbackGauge:
+    """Регистрирует метрику, значение которой читается при выгрузке."""
+    return REGISTRY.register(CallbackGauge(name, documentation, callback))
+
+
+def counter(name: str, documentation: str,
+            callback: Callable[[], float]) -> CallbackCounter:
+    """Регистрирует счётчик, значение которого читается при выгрузке."""
+    return REGISTRY.register(CallbackCounter(name, documentation, callback))
+
+
+def timed(stage: str) -> Callable:
+    """
+    Декоратор этапа конвейера.
+    Замеряет длительность вызова и считает исключения по типам.
+    """
+    latency = STAGE_LATENCY.labels(stage)
+
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception as error:
+                STAGE_ERRORS.labels(stage, type(error).__name__).inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+def _handler_class(registry: Registry) -> type:
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            logging.debug(f'Запрос метрик: {format % args}')
+
+    return MetricsHandler
+
+
+def serve(port: int, host: str = '127.0.0.1',
+          registry: Optional[Registry] = None):
+    """
+    Запускает HTTP-сервер метрик в фоновом потоке.
+    http.server импортируется только здесь, чтобы не замедлять запуск.
+    """
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host, port),
+                                 _handler_class(registry or REGISTRY))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True,
+                              name='metrics')
+    thread.start()
+    logging.info(f'Метрики доступны на http://{host}:{port}/metrics')
+    return server
@@ -0,0 +1,289 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import telegram
+
+import homework
+import outbox
+import tenants
+from tenants import Tenant
+
+GLOBAL_RATE = 30.0
+CHAT_RATE = 1.0
+MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = '\n\n'
+WORKERS = int(os.getenv('TELEGRAM_SEND_WORKERS', 8))
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate: float, capacity: float,
+                 now: float = None) -> None:
+        """Создаёт полное ведро."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self.updated, 0.0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Возвращает, сколько секунд ждать до появления токена."""
+        self._refill(now)
+        wait = max(self.paused_until - now, 0.0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, now: float) -> None:
+        """Забирает один токен."""
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now: float, seconds: float) -> None:
+        """Запрещает выдачу токенов на seconds секунд."""
+        self.paused_until = max(self.paused_until, now + seconds)
+
+
+class FloodAwareBot:
+    """Обёртка бота, запоминающая retry_after из ответа Telegram 429."""
+
+    def __init__(self, bot: telegram.Bot) -> None:
+        """Оборачивает настоящего бота."""
+        self._bot = bot
+        self.retry_after: Optional[float] = None
+
+    def send_message(self, *args, **kwargs):
+        """Отправляет сообщение, запоминая требование подождать."""
+        try:
+            return self._bot.send_message(*args, **kwargs)
+        except telegram.error.RetryAfter as error:
+            self.retry_after = float(error.retry_after)
+            raise
+
+
+@dataclass
+class Outgoing:
+    """Сообщение, ожидающее отправки в чат."""
+
+    tenant: Optional[Tenant]
+    bot: telegram.Bot
+    text: str
+    entries: list[outbox.Entry] = field(default_factory=list)
+
+
+class OutboundQueue:
+    """
+    Очередь исходящих сообщений Telegram с ограничением частоты.
+    Общее ведро ограничивает скорость всего бота, ведро чата — скорость
+    в отдельный чат. Сообщения, ждущие отправки в один чат, склеиваются
+    в одно, пока не превышена максимальная длина сообщения Telegram.
+    Сообщения в разные чаты отправляют workers потоков параллельно,
+    сообщения одного чата уходят по одному и по порядку.
+    """
+
+    def __init__(self, sender: Callable[[telegram.Bot, str], bool] = None,
+                 global_rate: float = GLOBAL_RATE,
+                 chat_rate: float = CHAT_RATE,
+                 clock: Callable[[], float] = time.monotonic,
+                 workers: int = WORKERS) -> None:
+        """Создаёт пустую очередь; sender по умолчанию send_message."""
+        self._sender = sender
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self._clock = clock
+        self._global = TokenBucket(global_rate, global_rate, clock())
+        self._chat_buckets: dict[str, TokenBucket] = {}
+        self._pending: dict[str, deque[Outgoing]] = {}
+        self._ready: list[tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._running = False
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        """Возвращает число сообщений, ожидающих отправки."""
+        with self._condition:
+            return sum(len(queue) for queue in self._pending.values())
+
+    def put(self, chat_id: str, text: str, bot: telegram.Bot,
+            tenant: Optional[Tenant] = None,
+            entries: list[outbox.Entry] = ()) -> None:
+        """
+        Ставит сообщение в очередь чата, склеивая с ожидающим.
+        entries — записи журнала исходящих, которые будут подтверждены
+        после доставки.
+        """
+        chat_id = str(chat_id)
+        with self._condition:
+            queue = self._pending.get(chat_id)
+            if queue is None:
+                queue = self._pending[chat_id] = deque()
+                self._schedule(chat_id)
+            last = queue[-1] if queue else None
+            if (last is not None and last.bot is bot
+                    and len(last.text) + len(COALESCE_SEPARATOR) + len(text)
+                    <= MAX_MESSAGE_LENGTH):
+                last.text += COALESCE_SEPARATOR + text
+                last.entries.extend(entries)
+                self.coalesced += 1
+            else:
+                queue.append(Outgoing(tenant, bot, text, list(entries)))
+            self._condition.notify_all()
+
+    def _bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(
+                self.chat_rate, 1, self._clock()
+            )
+        return bucket
+
+    def _schedule(self, chat_id: str) -> None:
+        ready_at = self._clock() + self._bucket(chat_id).delay(self._clock())
+        heapq.heappush(self._ready,
+                       (ready_at, next(self._sequence), chat_id))
+
+    def _take(self) -> Optional[tuple[str, Outgoing]]:
+        """Забирает сообщение, готовое к отправке, или ждёт его."""
+        if not self._ready:
+            self._condition.wait()
+            return None
+        now = self._clock()
+        ready_at, _, chat_id = self._ready[0]
+        bucket = self._bucket(chat_id)
+        wait = max(ready_at - now, bucket.delay(now), self._global.delay(now))
+        if wait > 0:
+            self._condition.wait(wait)
+            return None
+        heapq.heappop(self._ready)
+        self._global.consume(now)
+        bucket.consume(now)
+        self._in_flight += 1
+        return chat_id, self._pending[chat_id].popleft()
+
+    def _deliver(self, chat_id: str,
+                 outgoing: Outgoing) -> tuple[bool, Optional[float]]:
+        bot = FloodAwareBot(outgoing.bot)
+        sender = self._sender or homework.send_message
+        delivered = False
+        try:
+            with tenants.activate(outgoing.tenant), \
+                    tenants.addressed(chat_id):
+                delivered = sender(bot, outgoing.text)
+        except Exception as error:
+            logging.exception(f'Сбой отправки сообщения в чат {chat_id}: '
+                              f'{error}')
+        return delivered, bot.retry_after
+
+    def _finish(self, chat_id: str, outgoing: Outgoing, delivered: bool,
+                retry_after: Optional[float]) -> None:
+        self._in_flight -= 1
+        queue = self._pending[chat_id]
+        if not retry_after:
+            box = outbox.current()
+            for entry in outgoing.entries:
+                if delivered:
+                    box.ack(entry)
+                else:
+                    box.fail(entry)
+        if retry_after:
+            now = self._clock()
+            logging.warning(f'Telegram просит подождать {retry_after} с '
+                            f'перед отправкой в чат {chat_id}')
+            self._bucket(chat_id).pause(now, retry_after)
+            self._global.pause(now, retry_after)
+            queue.appendleft(outgoing)
+        if queue:
+            self._schedule(chat_id)
+        else:
+            del self._pending[chat_id]
+        self._condition.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                taken = self._take()
+            if taken is None:
+                continue
+            self._dispatch(*taken)
+
+    def _dispatch(self, chat_id: str, outgoing: Outgoing) -> None:
+        delivered, retry_after = self._deliver(chat_id, outgoing)
+        with self._condition:
+            self._finish(chat_id, outgoing, delivered, retry_after)
+
+    def start(self) -> None:
+        """Запускает фоновые потоки отправки."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True,
+                             name=f'telegram-outbound-{number}')
+            for number in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def drain(self, timeout: float = None) -> bool:
+        """Ждёт отправки всех сообщений; False, если не успели."""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+            return True
+
+    def stop(self) -> None:
+        """Останавливает фоновые потоки, не дожидаясь очереди."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+class QueueingBot:
+    """
+    Заменитель бота для конвейера опроса.
+    Вместо отправки ставит сообщение в очередь, которую разбирает
+    фоновый поток.
+    """
+
+    deferred = True
+
+    def __init__(self, bot: telegram.Bot, queue: OutboundQueue) -> None:
+        """Связывает настоящего бота с очередью отправки."""
+        self.bot = bot
+        self.queue = queue
+
+    def send_message(self, chat_id: str, text: str, **kwargs) -> None:
+        """
+        Ставит сообщение в очередь от имени текущего студента.
+        Запись журнала исходящих подтвердит очередь после доставки.
+        """
+        self.queue.put(chat_id, text, self.bot, tenants.current(),
+                       outbox.handoff())
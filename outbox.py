@@ -0,0 +1,546 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+BASE_DELAY = 5.0
+MAX_DELAY = 600.0
+COMPACT_THRESHOLD = 1000
+DRAIN_INTERVAL = 1.0
+
+
+@dataclass
+class Entry:
+    """Сообщение в журнале исходящих."""
+
+    id: int
+    tenant: str
+    text: str
+    attempts: int = 0
+    next_attempt: float = 0.0
+    in_flight: bool = False
+    handed_off: bool = False
+    buffered: bool = False
+    chat_id: Optional[str] = None
+    key: Optional[str] = None
+
+    def record(self) -> dict:
+        """Возвращает запись журнала о добавлении сообщения."""
+        record = {'op': 'add', 'id': self.id, 'tenant': self.tenant,
+                  'text': self.text}
+        if self.chat_id is not None:
+            record['chat'] = self.chat_id
+        return record
+
+
+_sending: ContextVar[tuple[Entry, ...]] = ContextVar('outbox_sending',
+                                                     default=())
+
+
+@contextmanager
+def _journal_lock(path: str) -> Iterator[None]:
+    with open(f'{path}.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _parse(line) -> Optional[dict]:
+    try:
+        return json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        logging.warning('Пропущена повреждённая запись журнала исходящих')
+        return None
+
+
+def _entry(record: dict) -> Entry:
+    return Entry(record['id'], record['tenant'], record['text'],
+                 chat_id=record.get('chat'))
+
+
+def _read_tail(path: str, position: Optional[tuple[int, int]]
+               ) -> tuple[tuple[int, int], bool, list[dict]]:
+    with open(path, 'rb') as journal:
+        status = os.fstat(journal.fileno())
+        inode, offset = position or (status.st_ino, 0)
+        reset = inode != status.st_ino or status.st_size < offset
+        if reset:
+            offset = 0
+        journal.seek(offset)
+        tail = journal.read()
+    complete = tail.rfind(b'\n') + 1
+    records = [record for record in map(_parse, tail[:complete].splitlines())
+               if record is not None]
+    return (status.st_ino, offset + complete), reset, records
+
+
+def read_journal(path: str) -> dict[int, Entry]:
+    """Читает журнал и возвращает неподтверждённые записи по id."""
+    entries: dict[int, Entry] = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding='utf-8') as journal:
+        for line in journal:
+            record = _parse(line)
+            if record is None:
+                continue
+            if record['op'] == 'add':
+                entries[record['id']] = _entry(record)
+            else:
+                entries.pop(record['id'], None)
+    return entries
+
+
+def sibling_journals(path: str) -> list[str]:
+    """
+    Возвращает журналы соседних шардов и реплик.
+    Это файлы того же каталога с тем же началом имени и расширением,
+    например outbox.jsonl, outbox.shard0.jsonl и outbox.b.jsonl.
+    Сам path в список не входит.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    prefix = name.split('.', 1)[0] + '.'
+    extension = os.path.splitext(name)[1]
+    return sorted(
+        os.path.join(directory, other) for other in os.listdir(directory)
+        if other != name and other.startswith(prefix)
+        and other.endswith(extension)
+    )
+
+
+class SiblingIndex:
+    """
+    Неподтверждённые записи журналов соседних процессов по студентам.
+    Каждый журнал читается целиком один раз, дальше дочитывается только
+    дописанный с прошлого раза хвост. Сжатый журнал (новый файл)
+    перечитывается заново.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Готовит индекс журналов, соседних с path."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._positions: dict[str, tuple[int, int]] = {}
+        self._owners: dict[str, dict[int, str]] = {}
+        self._by_tenant: dict[str, dict[str, dict[int, Entry]]] = {}
+
+    def _forget(self, path: str, entry_id: int) -> None:
+        tenant = self._owners.get(path, {}).pop(entry_id, None)
+        if tenant is None:
+            return
+        files = self._by_tenant[tenant]
+        del files[path][entry_id]
+        if not files[path]:
+            del files[path]
+        if not files:
+            del self._by_tenant[tenant]
+
+    def _drop(self, path: str) -> None:
+        for entry_id in list(self._owners.get(path, {})):
+            self._forget(path, entry_id)
+        self._owners.pop(path, None)
+        self._positions.pop(path, None)
+
+    def _read_tail(self, path: str) -> None:
+        try:
+            position, reset, records = _read_tail(path,
+                                                  self._positions.get(path))
+        except FileNotFoundError:
+            self._drop(path)
+            return
+        if reset:
+            self._drop(path)
+        self._positions[path] = position
+        for record in records:
+            self._forget(path, record['id'])
+            if record['op'] == 'add':
+                self._owners.setdefault(path, {})[record['id']] = (
+                    record['tenant']
+                )
+                self._by_tenant.setdefault(record['tenant'], {}).setdefault(
+                    path, {}
+                )[record['id']] = _entry(record)
+
+    def refresh(self) -> None:
+        """Дочитывает журналы соседей и забывает исчезнувшие."""
+        paths = sibling_journals(self.path)
+        with self._lock:
+            for path in set(self._positions) - set(paths):
+                self._drop(path)
+            for path in paths:
+                try:
+                    self._read_tail(path)
+                except OSError as error:
+                    logging.error(f'Не удалось прочитать журнал {path}: '
+                                  f'{error}')
+
+    def journals(self, tenant: str) -> list[str]:
+        """Возвращает журналы, где есть сообщения студента."""
+        with self._lock:
+            return sorted(self._by_tenant.get(tenant, {}))
+
+    def take(self, path: str, tenant: str) -> list[Entry]:
+        """
+        Забирает сообщения студента из журнала path.
+        Перед этим дочитывает журнал: вызывать под его блокировкой.
+        """
+        with self._lock:
+            self._read_tail(path)
+            entries = self._by_tenant.get(tenant, {}).get(path, {})
+            moved = sorted(entries.values(), key=lambda entry: entry.id)
+            for entry in moved:
+                self._forget(path, entry.id)
+            return moved
+
+
+class Outbox:
+    """
+    Журнал исходящих уведомлений.
+    Сообщение записывается в журнал (с fsync) до отправки и
+    подтверждается только после того, как Telegram его принял.
+    Неотправленные сообщения повторяются с экспоненциальной паузой.
+    Подтверждения пишутся без fsync: после сбоя сообщение может уйти
+    повторно, но не потеряется. Журнал периодически сжимается, чтобы
+    восстановление после перезапуска читало только неотправленное.
+    Процесс, получивший студента, забирает его сообщения из журналов
+    соседних шардов и реплик через reload.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 base_delay: float = BASE_DELAY,
+                 max_delay: float = MAX_DELAY,
+                 compact_threshold: int = COMPACT_THRESHOLD,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Открывает журнал и восстанавливает неподтверждённые записи."""
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.compact_threshold = compact_threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: dict[str, dict[int, Entry]] = {}
+        self._next_id = 1
+        self._acked_since_compact = 0
+        self._journal = None
+        self._position: Optional[tuple[int, int]] = None
+        self._siblings: Optional[SiblingIndex] = None
+        if path:
+            self._siblings = SiblingIndex(path)
+            self._replay()
+            self._journal = open(path, 'a', encoding='utf-8')
+
+    def _replay(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with _journal_lock(self.path):
+            entries = read_journal(self.path)
+            self._next_id = max([self._next_id - 1, *entries]) + 1
+            for entry in entries.values():
+                self._pending.setdefault(entry.tenant, {})[entry.id] = entry
+            if entries:
+                logging.info(f'Восстановлено неотправленных сообщений: '
+                             f'{len(entries)}')
+            self._compact(entries.values())
+
+    def _write(self, record: dict, sync: bool) -> None:
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        if sync:
+            os.fsync(self._journal.fileno())
+
+    def _compact(self, entries) -> None:
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as journal:
+            for entry in entries:
+                journal.write(json.dumps(entry.record(), ensure_ascii=False)
+                              + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+            size = journal.tell()
+        os.replace(temporary, self.path)
+        self._position = (os.stat(self.path).st_ino, size)
+        self._acked_since_compact = 0
+
+    def _retain(self, alive: Callable[[int], bool]) -> None:
+        for tenant in list(self._pending):
+            entries = self._pending[tenant]
+            for entry_id in [entry_id for entry_id in entries
+                             if not alive(entry_id)]:
+                del entries[entry_id]
+            if not entries:
+                del self._pending[tenant]
+
+    def __len__(self) -> int:
+        """Возвращает число неподтверждённых сообщений."""
+        with self._lock:
+            return sum(len(entries) for entries in self._pending.values())
+
+    def add(self, tenant: str, text: str, delay: float = 0.0,
+            chat_id: Optional[str] = None,
+            key: Optional[str] = None) -> Entry:
+        """
+        Записывает сообщение в журнал перед первой попыткой отправки.
+        С delay сообщение откладывается: его заберёт due через delay
+        секунд, а до тех пор его возвращает buffered. chat_id задаёт
+        чат подписчика; None означает чат студента. key — работа,
+        о которой сообщение; по нему supersede находит устаревшие.
+        """
+        with self._lock:
+            entry = Entry(self._next_id, tenant, text, in_flight=not delay,
+                          buffered=bool(delay), chat_id=chat_id, key=key)
+            if delay:
+                entry.next_attempt = self._clock() + delay
+            self._next_id += 1
+            self._write(entry.record(), sync=True)
+            self._pending.setdefault(tenant, {})[entry.id] = entry
+            return entry
+
+    def ack(self, entry: Entry) -> None:
+        """Отмечает сообщение доставленным."""
+        with self._lock:
+            entries = self._pending.get(entry.tenant, {})
+            if entries.pop(entry.id, None) is None:
+                return
+            if not entries:
+                del self._pending[entry.tenant]
+            self._write({'op': 'ack', 'id': entry.id}, sync=False)
+            self._acked_since_compact += 1
+            if (self._journal is not None
+                    and self._acked_since_compact >= self.compact_threshold):
+                self._journal.close()
+                with _journal_lock(self.path):
+                    kept = read_journal(self.path)
+                    self._retain(kept.__contains__)
+                    self._compact(kept.values())
+                self._journal = open(self.path, 'a', encoding='utf-8')
+
+    def fail(self, entry: Entry) -> None:
+        """Откладывает повторную отправку с экспоненциальной паузой."""
+        with self._lock:
+            entry.attempts += 1
+            entry.in_flight = False
+            entry.handed_off = False
+            entry.buffered = False
+            delay = min(self.base_delay * 2 ** (entry.attempts - 1),
+                        self.max_delay)
+            entry.next_attempt = self._clock() + delay
+        logging.warning(f'Сообщение {entry.id} не доставлено, повтор '
+                        f'через {delay:.0f} с')
+
+    def due(self, tenant: str) -> list[Entry]:
+        """Забирает сообщения студента, которым пора повторить отправку."""
+        now = self._clock()
+        with self._lock:
+            entries = [entry for entry in self._pending.get(tenant, {})
+                       .values()
+                       if not entry.in_flight and entry.next_attempt <= now]
+            for entry in entries:
+                entry.in_flight = True
+                entry.buffered = False
+            return entries
+
+    def buffered(self, tenant: str) -> list[Entry]:
+        """Возвращает отложенные сообщения студента."""
+        with self._lock:
+            return [entry for entry in self._pending.get(tenant, {}).values()
+                    if entry.buffered]
+
+    def release(self, tenant: str) -> None:
+        """Делает отложенные сообщения студента готовыми к отправке."""
+        with self._lock:
+            for entry in self._pending.get(tenant, {}).values():
+                if entry.buffered:
+                    entry.next_attempt = 0.0
+
+    def supersede(self, tenant: str, key: str) -> int:
+        """
+        Снимает отложенные сообщения студента о работе key.
+        Вызывается, когда новый статус работы делает их устаревшими.
+        Возвращает число снятых сообщений.
+        """
+        with self._lock:
+            stale = [entry for entry in self._pending.get(tenant, {}).values()
+                     if entry.buffered and entry.key == key]
+        for entry in stale:
+            self.ack(entry)
+        return len(stale)
+
+    def tenants_with_due(self) -> list[str]:
+        """Возвращает студентов, у которых есть сообщения к повтору."""
+        now = self._clock()
+        with self._lock:
+            return [tenant for tenant, entries in self._pending.items()
+                    if any(not entry.in_flight and entry.next_attempt <= now
+                           for entry in entries.values())]
+
+    def attempt(self, entry: Entry, send: Callable[[], bool]) -> bool:
+        """
+        Пытается отправить сообщение и отмечает исход в журнале.
+        Если отправитель забрал сообщение через handoff, исход
+        отмечает он сам.
+        """
+        return self.attempt_all([entry], send)
+
+    def attempt_all(self, entries: list[Entry],
+                    send: Callable[[], bool]) -> bool:
+        """Отправляет несколько записей журнала одним сообщением."""
+        token = _sending.set(tuple(entries))
+        try:
+            sent = send()
+        except Exception:
+            sent = False
+            logging.exception(f'Сбой отправки сообщения {entries[0].id}')
+        finally:
+            _sending.reset(token)
+        for entry in entries:
+            if entry.handed_off:
+                continue
+            if sent:
+                self.ack(entry)
+            else:
+                self.fail(entry)
+        return sent
+
+    def _forget_moved(self) -> None:
+        self._position, reset, records = _read_tail(self.path,
+                                                    self._position)
+        if reset:
+            self._retain(read_journal(self.path).__contains__)
+            return
+        moved = {record['id'] for record in records
+                 if record['op'] == 'moved'}
+        if moved:
+            self._retain(lambda entry_id: entry_id not in moved)
+
+    def _adopt(self, path: str, tenant: str) -> int:
+        with _journal_lock(path):
+            moved = self._siblings.take(path, tenant)
+            if not moved:
+                return 0
+            with self._lock:
+                for entry in moved:
+                    adopted = Entry(self._next_id, tenant, entry.text,
+                                    chat_id=entry.chat_id)
+                    self._next_id += 1
+                    self._write(adopted.record(), sync=True)
+                    self._pending.setdefault(tenant, {})[adopted.id] = adopted
+            with open(path, 'a', encoding='utf-8') as journal:
+                for entry in moved:
+                    journal.write(json.dumps({'op': 'moved', 'id': entry.id})
+                                  + '\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+        return len(moved)
+
+    def reload(self, tenant: str) -> int:
+        """
+        Перечитывает сообщения студента, которого опрашивал другой процесс.
+        Записи, которые другой процесс уже перенёс из этого журнала к себе,
+        забываются. Неподтверждённые сообщения студента из журналов
+        соседних процессов переносятся в этот журнал и отправляются
+        отсюда. Журналы дочитываются с места, где их оставили в прошлый
+        раз, поэтому получение студента не перечитывает их целиком.
+        Возвращает число перенесённых сообщений.
+        """
+        if not self.path:
+            return 0
+        with _journal_lock(self.path), self._lock:
+            self._forget_moved()
+        self._siblings.refresh()
+        adopted = 0
+        for path in self._siblings.journals(tenant):
+            try:
+                adopted += self._adopt(path, tenant)
+            except OSError as error:
+                logging.error(f'Не удалось перенести сообщения из {path}: '
+                              f'{error}')
+        if adopted:
+            logging.info(f'Перенесено неотправленных сообщений студента '
+                         f'{tenant}: {adopted}')
+        return adopted
+
+    def close(self) -> None:
+        """Закрывает файл журнала."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+class Drainer:
+    """
+    Фоновый поток повторной отправки для режима одного студента.
+    Раз в interval секунд проверяет, есть ли в общем журнале сообщения,
+    которым подошёл срок повтора или конец окна сводки, и вызывает retry.
+    Так повтор не ждёт следующего цикла опроса.
+    """
+
+    def __init__(self, retry: Callable[[], None],
+                 interval: float = DRAIN_INTERVAL) -> None:
+        """Готовит поток; запускает его start."""
+        self.retry = retry
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not current().tenants_with_due():
+                continue
+            try:
+                self.retry()
+            except Exception as error:
+                logging.exception(f'Сбой повторной отправки: {error}')
+
+    def start(self) -> 'Drainer':
+        """Запускает поток повторной отправки."""
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='outbox-drainer')
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает поток повторной отправки."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def handoff() -> list[Entry]:
+    """
+    Забирает записи журнала, которые отправляются сейчас.
+    Вызывается отправителем, который доставит сообщение позже и сам
+    отметит исход через ack или fail.
+    """
+    entries = _sending.get()
+    for entry in entries:
+        entry.handed_off = True
+    return list(entries)
+
+
+_outbox = Outbox()
+
+
+def install(outbox: Outbox) -> Outbox:
+    """Делает журнал общим для всех отправок процесса."""
+    global _outbox
+    previous, _outbox = _outbox, outbox
+    if previous is not outbox:
+        previous.close()
+    return outbox
+
+
+def current() -> Outbox:
+    """Возвращает общий журнал исходящих."""
+    return _outbox
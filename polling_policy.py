@@ -0,0 +1,95 @@
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+REVIEWING = 'reviewing'
+IDLE = 'idle'
+ERROR = 'error'
+STANDBY = 'standby'
+
+BASE_PERIOD = 600
+REVIEWING_PERIOD = 120
+MAX_IDLE_PERIOD = 1800
+MAX_ERROR_PERIOD = 3600
+STANDBY_PERIOD = 5
+IDLE_BACKOFF = 1.5
+JITTER = 0.1
+
+
+class RequestBudget:
+    """
+    Общий для всех студентов лимит запросов к API в час.
+    Каждый опрос занимает слот; если слоты на нужное время заняты,
+    опрос сдвигается на ближайший свободный.
+    """
+
+    def __init__(self, requests_per_hour: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт бюджет с равномерно распределёнными слотами."""
+        self.interval = 3600 / requests_per_hour
+        self._clock = clock
+        self._next_free = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, delay: float) -> float:
+        """Занимает слот не раньше чем через delay и возвращает задержку."""
+        with self._lock:
+            now = self._clock()
+            slot = max(now + delay, self._next_free)
+            self._next_free = slot + self.interval
+            return slot - now
+
+
+class PollPolicy:
+    """
+    Политика выбора паузы до следующего опроса одного студента.
+    Пока работа на проверке, опрашивает чаще; без активных работ и при
+    ошибках API постепенно увеличивает паузу. Пока студента опрашивает
+    другая реплика, проверяет аренду каждые standby секунд.
+    """
+
+    def __init__(self, base: float = BASE_PERIOD,
+                 reviewing: float = REVIEWING_PERIOD,
+                 max_idle: float = MAX_IDLE_PERIOD,
+                 max_error: float = MAX_ERROR_PERIOD,
+                 standby: float = STANDBY_PERIOD,
+                 jitter: float = JITTER,
+                 budget: Optional[RequestBudget] = None,
+                 rng: Callable[[], float] = random.random) -> None:
+        """Настраивает периоды опроса и разброс."""
+        self.base = base
+        self.reviewing = reviewing
+        self.max_idle = max_idle
+        self.max_error = max_error
+        self.standby = standby
+        self.jitter = jitter
+        self.budget = budget
+        self._rng = rng
+        self.idle_streak = 0
+        self.error_streak = 0
+
+    def _raw_delay(self, outcome: str) -> float:
+        if outcome == ERROR:
+            self.idle_streak = 0
+            self.error_streak += 1
+            return min(self.base * 2 ** (self.error_streak - 1),
+                       self.max_error)
+        self.error_streak = 0
+        if outcome == REVIEWING:
+            self.idle_streak = 0
+            return self.reviewing
+        self.idle_streak += 1
+        return min(self.base * IDLE_BACKOFF ** (self.idle_streak - 1),
+                   self.max_idle)
+
+    def next_delay(self, outcome: str) -> float:
+        """Возвращает паузу в секундах по результату последнего опроса."""
+        if outcome == STANDBY:
+            return self.standby
+        delay = self._raw_delay(outcome)
+        if self.jitter:
+            delay *= 1 + self.jitter * (2 * self._rng() - 1)
+        if self.budget is not None:
+            delay = self.budget.reserve(delay)
+        return delay
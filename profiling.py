@@ -0,0 +1,150 @@
+import io
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+PROFILE_CYCLES = int(os.getenv('PROFILE_CYCLES', 0))
+SIGNAL_CYCLES = int(os.getenv('PROFILE_SIGNAL_CYCLES', 10))
+SIGNAL = signal.SIGUSR1
+TOP_ENTRIES = 30
+TRACEMALLOC_FRAMES = 1
+UNSUPPORTED = ('Профилирование по SIGUSR1 работает только в режиме одного '
+               'студента, сигнал пропущен')
+
+
+@contextmanager
+def signal_handler(handler, signum: int = SIGNAL) -> Iterator[None]:
+    """
+    Назначает обработчик сигнала профилирования на время блока.
+    В режимах без профилировщика сигнал иначе завершил бы процесс.
+    Работает только в main-потоке.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signum, handler)
+    try:
+        yield
+    finally:
+        signal.signal(signum, previous)
+
+
+class CycleProfiler:
+    """
+    Профилирование нескольких циклов опроса по запросу.
+    Окно из cycles циклов открывается при запуске (PROFILE_CYCLES) или
+    по сигналу SIGUSR1 со следующего цикла. На время окна работают
+    cProfile и tracemalloc, а по его окончании рядом с журналом
+    сохраняются profile-<время>.prof для pstats и profile-<время>.txt
+    со списком самых долгих функций и мест выделения памяти.
+    Вне окна цикл только проверяет два счётчика.
+    """
+
+    def __init__(self, directory: str, cycles: int = PROFILE_CYCLES,
+                 signal_cycles: int = SIGNAL_CYCLES,
+                 top: int = TOP_ENTRIES) -> None:
+        """Готовит профилировщик; окно откроется, если cycles > 0."""
+        self.directory = directory
+        self.signal_cycles = signal_cycles
+        self.top = top
+        self.requested = cycles
+        self.remaining = 0
+        self.profiled = 0
+        self._profile = None
+        self._started = 0.0
+        self._own_tracemalloc = False
+        self._previous = None
+
+    def request(self, cycles: Optional[int] = None) -> None:
+        """Открывает окно профилирования со следующего цикла."""
+        self.requested = cycles or self.signal_cycles
+
+    def _handle(self, signum: int, frame) -> None:
+        self.request()
+
+    def install(self, signum: int = SIGNAL) -> 'CycleProfiler':
+        """Назначает сигнал, включающий профилирование."""
+        if threading.current_thread() is threading.main_thread():
+            self._previous = (signum, signal.signal(signum, self._handle))
+        return self
+
+    def uninstall(self) -> None:
+        """Возвращает прежний обработчик и сохраняет незаконченное окно."""
+        if self._previous is not None:
+            signal.signal(*self._previous)
+            self._previous = None
+        self.finish()
+
+    def _start(self) -> None:
+        import cProfile
+        import tracemalloc
+        self.remaining, self.requested = self.requested, 0
+        self.profiled = 0
+        self._started = time.time()
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._profile = cProfile.Profile()
+        logging.info(f'Профилирование включено на {self.remaining} '
+                     f'циклов опроса')
+
+    @contextmanager
+    def cycle(self) -> Iterator[None]:
+        """Замеряет цикл опроса, если открыто окно профилирования."""
+        if self.requested and not self.remaining:
+            self._start()
+        if not self.remaining:
+            yield
+            return
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self.profiled += 1
+            self.remaining -= 1
+            if not self.remaining:
+                self.finish()
+
+    def _summary(self, snapshot) -> str:
+        import pstats
+        import tracemalloc
+        stream = io.StringIO()
+        stream.write(f'Циклов опроса: {self.profiled}\n\n'
+                     f'Функции по суммарному времени:\n')
+        pstats.Stats(self._profile, stream=stream).sort_stats(
+            'cumulative'
+        ).print_stats(self.top)
+        stream.write('Места выделения памяти:\n')
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            stream.write(f'{stat}\n')
+        return stream.getvalue()
+
+    def finish(self) -> Optional[str]:
+        """
+        Закрывает окно и сохраняет результаты.
+        Возвращает путь к текстовой сводке или None, если окна не было.
+        """
+        if self._profile is None:
+            return None
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self._started))
+        base = os.path.join(self.directory, f'profile-{stamp}')
+        self._profile.dump_stats(f'{base}.prof')
+        with open(f'{base}.txt', 'w', encoding='utf-8') as summary:
+            summary.write(self._summary(snapshot))
+        self._profile = None
+        self.remaining = 0
+        logging.info(f'Профиль {self.profiled} циклов сохранён в {base}.txt')
+        return f'{base}.txt'
@@ -0,0 +1,63 @@
+from typing import Any, Callable, Iterable, Mapping, NamedTuple, Optional
+
+_MISSING = object()
+
+
+class Rule(NamedTuple):
+    """
+    Проверка одного ключа словаря.
+    Сообщение choice_message может содержать {value}.
+    """
+
+    key: str
+    missing_error: type
+    missing_message: str
+    expected: Optional[type] = None
+    type_error: type = TypeError
+    type_message: str = ''
+    choices: Optional[Mapping] = None
+    choice_error: type = ValueError
+    choice_message: str = ''
+    none_is_missing: bool = False
+
+
+def _compile_rule(rule: Rule) -> Callable[[dict], None]:
+    key, expected, choices = rule.key, rule.expected, rule.choices
+    missing = _MISSING
+    if rule.none_is_missing:
+        missing = None
+
+    def check(data: dict) -> None:
+        value = data.get(key, _MISSING)
+        if value is _MISSING or value is missing:
+            raise rule.missing_error(rule.missing_message)
+        if expected is not None and not isinstance(value, expected):
+            raise rule.type_error(rule.type_message)
+        if choices is not None and value not in choices:
+            raise rule.choice_error(rule.choice_message.format(value=value))
+
+    return check
+
+
+class Schema:
+    """
+    Схема словаря, заранее собранная в цепочку проверок.
+    Проверки выполняются за один проход в порядке правил, первое
+    нарушение выбрасывает исключение, указанное в правиле.
+    """
+
+    def __init__(self, not_dict_message: str, rules: Iterable[Rule],
+                 not_dict_error: type = TypeError) -> None:
+        """Собирает проверки правил."""
+        self.not_dict_error = not_dict_error
+        self.not_dict_message = not_dict_message
+        self.rules = tuple(rules)
+        self._checks = tuple(_compile_rule(rule) for rule in self.rules)
+
+    def validate(self, data: Any) -> dict:
+        """Возвращает data, если словарь соответствует схеме."""
+        if not isinstance(data, dict):
+            raise self.not_dict_error(self.not_dict_message)
+        for check in self._checks:
+            check(data)
+        return data
@@ -0,0 +1,79 @@
+import logging
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+import outbox
+import state_store
+from exceptions import ShutdownRequested
+
+DEADLINE = float(os.getenv('SHUTDOWN_DEADLINE', 20))
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class ShutdownSignal:
+    """
+    Флаг остановки процесса по SIGTERM и SIGINT.
+    Сигнал во время паузы между опросами прерывает её исключением
+    ShutdownRequested; сигнал во время опроса только поднимает флаг,
+    и цикл завершается, не обрывая начатую работу.
+    """
+
+    def __init__(self) -> None:
+        """Создаёт флаг без обработчиков сигналов."""
+        self.event = threading.Event()
+        self.signal = None
+        self._idle = False
+        self._previous = {}
+
+    @property
+    def requested(self) -> bool:
+        """Проверяет, запрошена ли остановка."""
+        return self.event.is_set()
+
+    def request(self, signum: int = None) -> None:
+        """Запрашивает остановку."""
+        self.signal = signum
+        self.event.set()
+
+    def _handle(self, signum: int, frame) -> None:
+        self.request(signum)
+        if self._idle:
+            self._idle = False
+            raise ShutdownRequested(signum)
+
+    def install(self, signals: Iterable[int] = SIGNALS) -> 'ShutdownSignal':
+        """Назначает обработчики сигналов; работает только в main-потоке."""
+        if threading.current_thread() is threading.main_thread():
+            for signum in signals:
+                self._previous[signum] = signal.signal(signum, self._handle)
+        return self
+
+    def uninstall(self) -> None:
+        """Возвращает прежние обработчики сигналов."""
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous.clear()
+
+    @contextmanager
+    def interruptible(self) -> Iterator[None]:
+        """
+        Отмечает паузу, которую сигнал остановки может прервать.
+        Если остановка уже запрошена, сразу выбрасывает ShutdownRequested.
+        """
+        self._idle = True
+        try:
+            if self.requested:
+                raise ShutdownRequested(self.signal)
+            yield
+        finally:
+            self._idle = False
+
+
+def finish() -> None:
+    """Сохраняет состояние и закрывает журнал исходящих перед выходом."""
+    state_store.current().flush()
+    outbox.current().close()
+    logging.info('Состояние сохранено, бот остановлен')
@@ -0,0 +1,338 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    tenant TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (tenant, homework)
+);
+CREATE TABLE IF NOT EXISTS history (
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT,
+    date_updated TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (tenant, homework)
+);
+CREATE TABLE IF NOT EXISTS subscriptions (
+    tenant TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    PRIMARY KEY (tenant, chat_id)
+);
+"""
+
+
+class StatusIndex:
+    """
+    Индекс последних отправленных статусов работ одного студента.
+    Сравнивает ответ API с индексом за один проход и возвращает только
+    работы, статус которых действительно изменился.
+    """
+
+    def __init__(self, store: 'StateStore', tenant: str,
+                 statuses: dict[str, str]) -> None:
+        """Создаёт индекс по уже известным статусам."""
+        self._store = store
+        self._tenant = tenant
+        self._statuses = statuses
+
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает последний отправленный статус работы."""
+        return self._statuses.get(key)
+
+    def transitions(self, homeworks: Iterable[dict],
+                    key: Callable[[dict], str]) -> list[dict]:
+        """
+        Возвращает работы, статус которых отличается от индекса.
+        Работы без статуса тоже возвращаются, чтобы ошибку увидел разбор.
+        """
+        statuses = self._statuses
+        return [homework for homework in homeworks
+                if not isinstance(homework, dict)
+                or 'status' not in homework
+                or statuses.get(key(homework)) != homework['status']]
+
+    def has_status(self, status: str) -> bool:
+        """Проверяет, есть ли у студента работа с данным статусом."""
+        return status in self._statuses.values()
+
+    def mark(self, key: str, status: str) -> None:
+        """Запоминает отправленный статус в индексе и хранилище."""
+        self._statuses[key] = status
+        self._store.set_status(self._tenant, key, status)
+
+
+class StateStore:
+    """
+    Хранилище курсора current_date и последних отправленных статусов.
+    Базовая реализация держит всё в памяти.
+    """
+
+    def __init__(self) -> None:
+        """Создаёт пустое хранилище."""
+        self._lock = threading.RLock()
+        self._cursors: dict[str, int] = {}
+        self._statuses: dict[str, dict[str, str]] = {}
+        self._indexes: dict[str, StatusIndex] = {}
+        self._history: dict[str, dict[str, dict]] = {}
+        self._subscriptions: dict[str, dict[str, None]] = {}
+
+    def get_cursor(self, tenant: str) -> Optional[int]:
+        """Возвращает сохранённый current_date студента."""
+        with self._lock:
+            return self._cursors.get(tenant)
+
+    def set_cursor(self, tenant: str, current_date: int) -> None:
+        """Запоминает current_date из последнего ответа API."""
+        with self._lock:
+            self._cursors[tenant] = current_date
+
+    def get_statuses(self, tenant: str) -> dict[str, str]:
+        """Возвращает последние отправленные статусы работ студента."""
+        with self._lock:
+            return dict(self._statuses.get(tenant, {}))
+
+    def set_status(self, tenant: str, homework: str, status: str) -> None:
+        """Запоминает статус, о котором студент уже уведомлён."""
+        with self._lock:
+            self._statuses.setdefault(tenant, {})[homework] = status
+
+    def status_index(self, tenant: str) -> StatusIndex:
+        """Возвращает индекс статусов студента, загружая его один раз."""
+        with self._lock:
+            index = self._indexes.get(tenant)
+            if index is None:
+                index = self._indexes[tenant] = StatusIndex(
+                    self, tenant, self.get_statuses(tenant)
+                )
+            return index
+
+    def reload(self, tenant: str) -> None:
+        """
+        Забывает загруженный индекс статусов студента.
+        Нужно, когда студента опрашивала другая реплика: следующее
+        обращение прочитает её статусы из базы.
+        """
+        with self._lock:
+            self._indexes.pop(tenant, None)
+
+    def add_history(self, tenant: str,
+                    homeworks: Iterable[tuple[str, dict]]) -> None:
+        """Сохраняет пачку работ из истории студента по их ключам."""
+        with self._lock:
+            self._history.setdefault(tenant, {}).update(homeworks)
+
+    def get_history(self, tenant: str) -> list[dict]:
+        """Возвращает сохранённую историю работ студента."""
+        with self._lock:
+            return list(self._history.get(tenant, {}).values())
+
+    def subscribe(self, tenant: str, chat_id: str) -> None:
+        """Подписывает чат на уведомления студента."""
+        with self._lock:
+            self._subscriptions.setdefault(tenant, {})[str(chat_id)] = None
+
+    def unsubscribe(self, tenant: str, chat_id: str) -> None:
+        """Отписывает чат от уведомлений студента."""
+        with self._lock:
+            self._subscriptions.get(tenant, {}).pop(str(chat_id), None)
+
+    def get_subscriptions(self, tenant: str) -> list[str]:
+        """Возвращает чаты, подписанные на уведомления студента."""
+        with self._lock:
+            return list(self._subscriptions.get(tenant, {}))
+
+    def flush(self) -> None:
+        """Сбрасывает отложенные записи на диск."""
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища."""
+        self.flush()
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Хранилище в SQLite с журналом WAL.
+    Записи копятся в памяти и сбрасываются одной транзакцией,
+    когда набирается batch_size изменений или проходит flush_interval.
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL) -> None:
+        """Открывает базу и создаёт таблицы, если их нет."""
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._connection = sqlite3.connect(path, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=FULL')
+        self._connection.executescript(SCHEMA)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def get_cursor(self, tenant: str) -> Optional[int]:
+        """Возвращает current_date с учётом ещё не сброшенных записей."""
+        with self._lock:
+            if tenant in self._cursors:
+                return self._cursors[tenant]
+            row = self._connection.execute(
+                'SELECT from_date FROM cursors WHERE tenant = ?',
+                (tenant,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def get_statuses(self, tenant: str) -> dict[str, str]:
+        """Возвращает статусы из базы, дополненные отложенными."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT homework, status FROM statuses WHERE tenant = ?',
+                (tenant,)
+            ).fetchall()
+            statuses = dict(rows)
+            statuses.update(self._statuses.get(tenant, {}))
+            return statuses
+
+    def set_cursor(self, tenant: str, current_date: int) -> None:
+        """Откладывает запись курсора до сброса пачки."""
+        with self._lock:
+            super().set_cursor(tenant, current_date)
+            self._written()
+
+    def set_status(self, tenant: str, homework: str, status: str) -> None:
+        """Откладывает запись статуса до сброса пачки."""
+        with self._lock:
+            super().set_status(tenant, homework, status)
+            self._written()
+
+    def add_history(self, tenant: str,
+                    homeworks: Iterable[tuple[str, dict]]) -> None:
+        """Записывает пачку работ из истории одной транзакцией."""
+        rows = [(tenant, key, homework.get('status'),
+                 homework.get('date_updated'),
+                 json.dumps(homework, ensure_ascii=False))
+                for key, homework in homeworks]
+        with self._lock:
+            connection = self._connection
+            connection.execute('BEGIN')
+            try:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?)',
+                    rows
+                )
+            except sqlite3.Error:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def get_history(self, tenant: str) -> list[dict]:
+        """Возвращает историю работ студента из базы."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT record FROM history WHERE tenant = ?', (tenant,)
+            ).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def subscribe(self, tenant: str, chat_id: str) -> None:
+        """Записывает подписку в базу сразу."""
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR IGNORE INTO subscriptions VALUES (?, ?)',
+                (tenant, str(chat_id))
+            )
+
+    def unsubscribe(self, tenant: str, chat_id: str) -> None:
+        """Удаляет подписку из базы."""
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM subscriptions WHERE tenant = ? AND chat_id = ?',
+                (tenant, str(chat_id))
+            )
+
+    def get_subscriptions(self, tenant: str) -> list[str]:
+        """Читает подписки из базы, чтобы видеть изменения других процессов."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT chat_id FROM subscriptions WHERE tenant = ? '
+                'ORDER BY rowid', (tenant,)
+            ).fetchall()
+        return [chat_id for chat_id, in rows]
+
+    def _written(self) -> None:
+        self._pending += 1
+        elapsed = time.monotonic() - self._last_flush
+        if self._pending >= self.batch_size or elapsed >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            statuses = [(tenant, homework, status)
+                        for tenant, items in self._statuses.items()
+                        for homework, status in items.items()]
+            connection = self._connection
+            connection.execute('BEGIN')
+            try:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                    self._cursors.items()
+                )
+                connection.executemany(
+                    'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                    statuses
+                )
+            except sqlite3.Error:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            logging.debug(f'Сохранено изменений состояния: {self._pending}')
+            self._cursors.clear()
+            self._statuses.clear()
+            self._pending = 0
+
+    def close(self) -> None:
+        """Сбрасывает изменения и закрывает соединение."""
+        with self._lock:
+            self.flush()
+            self._connection.close()
+
+
+def open_store(path: Optional[str]) -> StateStore:
+    """Открывает хранилище: SQLite по пути или память для None."""
+    if not path:
+        return StateStore()
+    return SQLiteStateStore(path)
+
+
+_store: StateStore = StateStore()
+
+
+def install(store: StateStore) -> StateStore:
+    """Делает хранилище общим для всех опросов процесса."""
+    global _store
+    previous, _store = _store, store
+    if previous is not store:
+        previous.close()
+    return store
+
+
+def current() -> StateStore:
+    """Возвращает общее хранилище состояния."""
+    return _store
@@ -0,0 +1,42 @@
+import argparse
+import logging
+from typing import Optional
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import homework
+import state_store
+
+
+def main(argv: Optional[list[str]] = None) -> list[str]:
+    """Разбирает параметры и меняет подписки чатов на студента."""
+    parser = argparse.ArgumentParser(
+        description='Подписка чатов на уведомления о работах студента.'
+    )
+    parser.add_argument('action', choices=('add', 'remove', 'list'))
+    parser.add_argument('tenant', help='имя студента из файла студентов '
+                                       f'или {homework.DEFAULT_TENANT}')
+    parser.add_argument('chat_id', nargs='?')
+    parser.add_argument('--db', default=homework.STATE_DB_PATH,
+                        help='путь к базе SQLite')
+    args = parser.parse_args(argv)
+    if args.action != 'list' and not args.chat_id:
+        parser.error('укажите chat_id')
+    store = state_store.open_store(args.db)
+    try:
+        if args.action == 'add':
+            store.subscribe(args.tenant, args.chat_id)
+        elif args.action == 'remove':
+            store.unsubscribe(args.tenant, args.chat_id)
+        chats = store.get_subscriptions(args.tenant)
+    finally:
+        store.close()
+    logging.info(f'Подписчики {args.tenant}: {", ".join(chats) or "нет"}')
+    return chats
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=homework.LOG_TEXT_FORMAT)
+    main()
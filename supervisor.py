@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from bisect import bisect
+from multiprocessing.connection import wait
+from typing import Callable, Hashable, Iterable
+
+import profiling
+import shutdown
+from exceptions import ShutdownRequested
+
+VIRTUAL_NODES = 128
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+STABLE_UPTIME = 60.0
+CHECK_INTERVAL = 5.0
+KILL_TIMEOUT = 5.0
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Кольцо согласованного хеширования.
+    Каждый узел занимает replicas точек кольца, а ключ принадлежит
+    ближайшей точке по часовой стрелке. При добавлении узла к нему
+    переходит около 1/N ключей, остальные остаются на своих узлах.
+    """
+
+    def __init__(self, nodes: Iterable[Hashable],
+                 replicas: int = VIRTUAL_NODES) -> None:
+        """Размещает узлы на кольце."""
+        points = sorted((_hash(f'{node}#{replica}'), node)
+                        for node in nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> Hashable:
+        """Возвращает узел, которому принадлежит ключ."""
+        if not self._nodes:
+            raise LookupError('На кольце нет ни одного узла')
+        index = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+    def assign(self, keys: Iterable[str]) -> dict[Hashable, list[str]]:
+        """Раскладывает ключи по узлам."""
+        shards = {node: [] for node in dict.fromkeys(self._nodes)}
+        for key in keys:
+            shards[self.node_for(key)].append(key)
+        return shards
+
+
+def shard_path(path: str, shard: int) -> str:
+    """Возвращает путь файла шарда: outbox.jsonl -> outbox.shard1.jsonl."""
+    root, extension = os.path.splitext(path)
+    return f'{root}.shard{shard}{extension}'
+
+
+def run_shard(path: str, shard: int, shards: int) -> None:
+    """
+    Точка входа процесса-шарда.
+    Опрашивает только студентов, которых кольцо отдаёт шарду, и пишет
+    журнал, журнал исходящих и метрики в собственные файл и порт.
+    """
+    import engine
+    import homework
+    import metrics
+    homework.setup_logging(shard_path(homework.LOG_FILE_PATH, shard))
+    if homework.METRICS_PORT:
+        metrics.serve(homework.METRICS_PORT + shard + 1)
+    ring = HashRing(range(shards))
+
+    def owned(tenant) -> bool:
+        return ring.node_for(tenant.name) == shard
+
+    engine.run(path, tenant_filter=owned,
+               outbox_path=shard_path(homework.OUTBOX_PATH, shard))
+
+
+class Supervisor:
+    """
+    Запускает workers процессов-шардов и следит за ними.
+    Студенты распределяются по шардам согласованным хешированием имени,
+    поэтому при изменении числа процессов переезжает лишь их малая часть.
+    Упавший шард перезапускается; если он падает снова, не проработав
+    stable_uptime секунд, пауза перед перезапуском удваивается.
+    """
+
+    def __init__(self, path: str, workers: int,
+                 target: Callable[[str, int, int], None] = run_shard,
+                 context=None, restart_delay: float = RESTART_DELAY,
+                 max_restart_delay: float = MAX_RESTART_DELAY,
+                 stable_uptime: float = STABLE_UPTIME,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Готовит супервизор; процессы запускает start."""
+        self.path = path
+        self.workers = workers
+        self.target = target
+        self.context = context or multiprocessing.get_context('spawn')
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_uptime = stable_uptime
+        self.restarts = 0
+        self.processes: dict[int, multiprocessing.process.BaseProcess] = {}
+        self._clock = clock
+        self._started: dict[int, float] = {}
+        self._failures: dict[int, int] = {}
+        self._restart_at: dict[int, float] = {}
+
+    def start_worker(self, shard: int) -> None:
+        """Запускает процесс шарда."""
+        process = self.context.Process(
+            target=self.target, args=(self.path, shard, self.workers),
+            name=f'shard-{shard}'
+        )
+        process.start()
+        self.processes[shard] = process
+        self._started[shard] = self._clock()
+        logging.info(f'Запущен шард {shard} из {self.workers}, '
+                     f'pid {process.pid}')
+
+    def start(self) -> None:
+        """Запускает все шарды."""
+        for shard in range(self.workers):
+            self.start_worker(shard)
+
+    def check(self) -> None:
+        """Перезапускает завершившиеся шарды, когда истекает их пауза."""
+        now = self._clock()
+        for shard, process in list(self.processes.items()):
+            if process.exitcode is None:
+                continue
+            if shard not in self._restart_at:
+                failures = 0
+                if now - self._started[shard] < self.stable_uptime:
+                    failures = self._failures.get(shard, -1) + 1
+                self._failures[shard] = failures
+                delay = min(self.restart_delay * 2 ** failures,
+                            self.max_restart_delay)
+                self._restart_at[shard] = now + delay
+                logging.error(f'Шард {shard} завершился с кодом '
+                              f'{process.exitcode}, перезапуск через '
+                              f'{delay:.0f} с')
+            if now >= self._restart_at[shard]:
+                del self._restart_at[shard]
+                self.restarts += 1
+                self.start_worker(shard)
+
+    def _timeout(self) -> float:
+        now = self._clock()
+        delays = [max(moment - now, 0) for moment in self._restart_at.values()]
+        return min([CHECK_INTERVAL, *delays])
+
+    def _forward(self, signum: int, frame) -> None:
+        for process in list(self.processes.values()):
+            if process.pid is None or process.exitcode is not None:
+                continue
+            try:
+                os.kill(process.pid, signum)
+            except ProcessLookupError:
+                continue
+
+    def run(self) -> None:
+        """
+        Запускает шарды и перезапускает их до SIGTERM или SIGINT.
+        SIGUSR1 передаётся шардам.
+        """
+        with profiling.signal_handler(self._forward):
+            stop = shutdown.ShutdownSignal().install()
+            self.start()
+            try:
+                while True:
+                    sentinels = [process.sentinel
+                                 for process in self.processes.values()
+                                 if process.exitcode is None]
+                    with stop.interruptible():
+                        wait(sentinels, timeout=self._timeout())
+                    self.check()
+            except ShutdownRequested:
+                logging.info(f'Получен сигнал {stop.signal}, шарды '
+                             f'останавливаются')
+            finally:
+                stop.uninstall()
+                self.stop()
+
+    def stop(self, deadline: float = shutdown.DEADLINE) -> None:
+        """
+        Передаёт шардам SIGTERM и ждёт их в пределах deadline секунд.
+        Не успевшие остановиться процессы завершаются принудительно.
+        """
+        processes = [process for process in self.processes.values()
+                     if process.exitcode is None]
+        for process in processes:
+            process.terminate()
+        expires = time.monotonic() + deadline + KILL_TIMEOUT
+        for process in processes:
+            process.join(max(expires - time.monotonic(), 0))
+            if process.exitcode is None:
+                logging.warning(f'Шард {process.name} не остановился, '
+                                f'процесс завершается принудительно')
+                process.kill()
+                process.join()
+        self._restart_at.clear()
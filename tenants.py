@@ -0,0 +1,76 @@
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """Студент, чьи домашние работы опрашивает бот."""
+
+    name: str
+    practicum_token: str
+    chat_id: str
+    telegram_token: Optional[str] = None
+
+    @property
+    def headers(self) -> dict:
+        """Заголовки запроса к API Практикума от имени студента."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+
+_current_tenant: ContextVar[Optional[Tenant]] = ContextVar(
+    'current_tenant', default=None
+)
+_current_chat: ContextVar[Optional[str]] = ContextVar('current_chat',
+                                                      default=None)
+
+
+def current() -> Optional[Tenant]:
+    """
+    Возвращает студента, для которого выполняется опрос.
+    None означает однопользовательский режим с токенами из окружения.
+    """
+    return _current_tenant.get()
+
+
+@contextmanager
+def activate(tenant: Tenant) -> Iterator[Tenant]:
+    """Делает студента текущим в пределах блока with."""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def current_chat() -> Optional[str]:
+    """
+    Возвращает чат подписчика, которому отправляется сообщение.
+    None означает чат самого студента.
+    """
+    return _current_chat.get()
+
+
+@contextmanager
+def addressed(chat_id: Optional[str]) -> Iterator[Optional[str]]:
+    """Направляет отправки в пределах блока with в чат chat_id."""
+    token = _current_chat.set(chat_id)
+    try:
+        yield chat_id
+    finally:
+        _current_chat.reset(token)
+
+
+def load_tenants(path: str) -> list[Tenant]:
+    """Загружает список студентов из JSON-файла."""
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    if not isinstance(records, list):
+        raise TypeError('Файл студентов должен содержать список')
+    return [Tenant(name=str(record['name']),
+                   practicum_token=record['practicum_token'],
+                   chat_id=str(record['chat_id']),
+                   telegram_token=record.get('telegram_token'))
+            for record in records]
@@ -42,3 +42,22 @@ def data_with_new_hw_status(random_timestamp):
         ],
         'current_date': random_timestamp
     }
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    import circuit_breaker
+    import homework
+    import outbox
+    import state_store
+    circuit_breaker.reset()
+    homework.error_filter.clear()
+    monkeypatch.setattr(homework, 'STATE_DB_PATH',
+                        str(tmp_path / 'bot_state.sqlite3'))
+    monkeypatch.setattr(homework, 'OUTBOX_PATH',
+                        str(tmp_path / 'outbox.jsonl'))
+    state_store.install(state_store.StateStore())
+    outbox.install(outbox.Outbox())
+    yield
+    state_store.install(state_store.StateStore())
+    outbox.install(outbox.Outbox())
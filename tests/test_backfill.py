@@ -0,0 +1,111 @@
+import json
+import tracemalloc
+from http import HTTPStatus
+
+import pytest
+
+
+def split(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class TestArrayStream:
+
+    def test_items_survive_any_chunk_boundary(self):
+        from json_stream import ArrayStream
+        payload = {'current_date': 1700000000, 'homeworks': [
+            {'id': 1, 'homework_name': 'Работа 1', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'Работа 2', 'status': 'rejected'},
+            12345,
+        ], 'extra': None}
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        for size in (1, 3, 7, len(data)):
+            stream = ArrayStream(split(data, size), 'homeworks')
+            assert list(stream) == payload['homeworks']
+            assert stream.found
+            assert stream.fields == {'current_date': 1700000000,
+                                     'extra': None}
+
+    def test_memory_stays_flat_for_long_history(self):
+        from json_stream import ArrayStream
+        count = 20000
+        item = json.dumps({'homework_name': 'x' * 60, 'status': 'approved'})
+
+        def chunks():
+            yield b'{"homeworks": [' + item.encode()
+            for _ in range(count // 100):
+                yield (',' + item).encode() * 100
+            yield b'], "current_date": 1}'
+
+        tracemalloc.start()
+        try:
+            seen = sum(1 for _ in ArrayStream(chunks(), 'homeworks'))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert seen == count + 1
+        assert peak < 256 * 1024, (
+            'Потоковый разбор не должен держать в памяти весь ответ.'
+        )
+
+
+class FakeStreamResponse:
+    def __init__(self, payload, status_code=HTTPStatus.OK):
+        self.status_code = status_code
+        self.data = json.dumps(payload).encode()
+
+    def iter_content(self, chunk_size):
+        return iter(split(self.data, 5))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class TestBackfill:
+
+    def test_history_is_saved_in_batches(self, monkeypatch):
+        import backfill
+        import requests
+        import state_store
+        calls = []
+        homeworks = [{'id': number, 'homework_name': f'hw{number}',
+                      'status': 'approved'} for number in range(5)]
+
+        def fake_get(*args, **kwargs):
+            calls.append(kwargs)
+            return FakeStreamResponse({'homeworks': homeworks,
+                                       'current_date': 1700000000})
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        store = state_store.current()
+        batches = []
+        add_history = store.add_history
+        monkeypatch.setattr(
+            store, 'add_history',
+            lambda tenant, rows: batches.append(rows) or add_history(
+                tenant, rows
+            )
+        )
+        assert backfill.backfill(0, batch_size=2, mark_seen=True) == {
+            'default': 5
+        }
+        assert calls[0]['stream'] is True
+        assert calls[0]['params'] == {'from_date': 0}
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert store.get_history('default') == homeworks
+        assert store.get_statuses('default')['3'] == 'approved'
+        assert store.get_cursor('default') == 1700000000
+
+    def test_missing_homeworks_key_is_reported(self, monkeypatch):
+        import backfill
+        import requests
+        import state_store
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: FakeStreamResponse({'current_date': 1})
+        )
+        with pytest.raises(KeyError):
+            backfill.backfill_tenant(0, state_store.current())
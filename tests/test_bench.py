@@ -0,0 +1,31 @@
+import pytest
+
+
+class TestBench:
+
+    @pytest.mark.timeout(10)
+    def test_run_reports_polls_and_notifications(self, monkeypatch):
+        import homework
+        from bench import run, stubs
+        monkeypatch.setattr(homework, 'ENDPOINT', homework.ENDPOINT)
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN',
+                            homework.TELEGRAM_TOKEN)
+        practicum, telegram = stubs.start_servers(
+            stubs.StubConfig(latency=0.001, change_rate=1.0,
+                             telegram_latency=0.001)
+        )
+        try:
+            report = run.run_bench(
+                run.parse_args(['--tenants', '3', '--duration', '0.3',
+                                '--interval', '0.05', '--tick', '0.02']),
+                practicum.server_address[1], telegram.server_address[1]
+            )
+        finally:
+            for server in (practicum, telegram):
+                server.shutdown()
+                server.server_close()
+        assert report['polls'] >= 3
+        assert report['notifications'] >= 1, (
+            'Смена статуса на заглушке должна дойти до заглушки Telegram.'
+        )
+        assert report['notify_p99_ms'] >= report['notify_p50_ms']
@@ -0,0 +1,74 @@
+import telegram
+
+import utils
+
+
+class WarmBot(utils.MockTelegramBot):
+
+    def __init__(self, token, **kwargs):
+        super().__init__(**kwargs)
+        self.token = token
+
+    def get_me(self):
+        if self.token == 'bad':
+            raise telegram.error.InvalidToken()
+        return {'id': 1}
+
+
+class TestBotRegistry:
+
+    def test_bot_is_created_once_per_token(self):
+        from bot_registry import BotRegistry
+        created = []
+
+        def factory(token):
+            created.append(token)
+            return WarmBot(token)
+
+        registry = BotRegistry(factory=factory)
+        assert registry.get('a') is registry.get('a')
+        registry.get('b')
+        assert created == ['a', 'b'], (
+            'Бот и его пул соединений должны создаваться один раз на токен.'
+        )
+
+    def test_least_recently_used_bot_is_evicted(self):
+        from bot_registry import BotRegistry
+        closed = []
+        registry = BotRegistry(max_size=2, factory=WarmBot,
+                               close=lambda bot: closed.append(bot.token))
+        first = registry.get('a')
+        registry.get('b')
+        registry.get('a')
+        registry.get('c')
+        assert closed == ['b']
+        assert registry.get('a') is first
+        assert len(registry) == 2 and registry.evicted == 1
+        registry.close()
+        assert sorted(closed) == ['a', 'b', 'c']
+        assert len(registry) == 0
+
+    def test_warm_up_counts_ready_bots(self):
+        from bot_registry import BotRegistry
+        registry = BotRegistry(factory=WarmBot)
+        assert registry.warm_up(['a', 'bad', 'a', None, 'b']) == 2
+        assert len(registry) == 3
+
+    def test_created_bot_has_tuned_pool(self):
+        from bot_registry import close_bot, create_bot
+        bot = create_bot('1234:abcdefg', pool_size=4)
+        assert bot.request.con_pool_size == 4
+        close_bot(bot)
+
+    def test_engine_takes_bots_from_registry(self, monkeypatch):
+        import bot_registry
+        import engine
+        from tenants import Tenant
+        registry = bot_registry.BotRegistry(factory=WarmBot)
+        monkeypatch.setattr(bot_registry, '_registry', registry)
+        tenant_list = [Tenant(name=f'student{i}', practicum_token='token',
+                              chat_id=str(i), telegram_token='shared')
+                       for i in range(2)]
+        polling = engine.PollingEngine(tenant_list)
+        first, second = (polling.bot_for(tenant) for tenant in tenant_list)
+        assert first.bot is second.bot is registry.get('shared')
@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+
+
+class TestCircuitBreaker:
+
+    def make_breaker(self, clock):
+        from circuit_breaker import CircuitBreaker
+        return CircuitBreaker('api', failure_rate=0.5, min_calls=4,
+                              window=60, open_timeout=30, clock=clock)
+
+    def test_opens_on_failure_rate_and_fails_fast(self):
+        from exceptions import CircuitOpenError
+        breaker = self.make_breaker(utils.FakeClock())
+        for success in (True, False, True, False):
+            breaker.before_call()
+            breaker.record(success)
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        assert breaker.stats() == {'state': 'open', 'opened': 1,
+                                   'rejected': 1}
+
+    def test_half_open_allows_single_probe(self):
+        from exceptions import CircuitOpenError
+        clock = utils.FakeClock()
+        breaker = self.make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.now = 31
+        breaker.before_call()
+        assert breaker.state == 'half_open'
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        clock.now = 62
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == 'closed'
+        breaker.before_call()
+
+    def test_old_failures_leave_the_window(self):
+        clock = utils.FakeClock()
+        breaker = self.make_breaker(clock)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 120
+        for _ in range(3):
+            breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == 'closed'
+
+
+class TestGetApiAnswerBreaker:
+
+    def test_server_errors_open_breaker(self, monkeypatch, homework_module):
+        import circuit_breaker
+        from exceptions import CircuitOpenError
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(None)
+            return utils.MockResponseGET(
+                http_status=HTTPStatus.INTERNAL_SERVER_ERROR, data={}
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        for _ in range(circuit_breaker.MIN_CALLS):
+            with pytest.raises(RuntimeError):
+                homework_module.get_api_answer(0)
+        with pytest.raises(CircuitOpenError):
+            homework_module.get_api_answer(0)
+        assert len(calls) == circuit_breaker.MIN_CALLS, (
+            'При разомкнутом предохранителе запрос не должен отправляться.'
+        )
+
+    def test_client_errors_do_not_open_breaker(self, monkeypatch,
+                                               homework_module):
+        import circuit_breaker
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            utils.MockResponseGET(http_status=HTTPStatus.UNAUTHORIZED,
+                                  data={})
+        ))
+        for _ in range(circuit_breaker.MIN_CALLS * 2):
+            with pytest.raises(RuntimeError):
+                homework_module.get_api_answer(0)
+        breaker = circuit_breaker.breaker_for(homework_module.ENDPOINT)
+        assert breaker.state == 'closed'
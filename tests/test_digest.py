@@ -0,0 +1,117 @@
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def digest_box(monkeypatch):
+    import digest
+    import outbox
+    clock = utils.FakeClock()
+    monkeypatch.setattr(digest, 'WINDOW', 60)
+    return outbox.install(outbox.Outbox(clock=clock)), clock
+
+
+def homework(number, status, name_length=0):
+    return {'id': number, 'status': status,
+            'homework_name': f'hw{number}'.ljust(name_length, '_')}
+
+
+class TestDigest:
+
+    def test_batches_respect_length_limit(self):
+        from digest import HEADER, batches, render
+        texts = ['a' * 40, 'b' * 40, 'c' * 40, 'd' * 200]
+        groups = batches(texts, text=str, limit=len(HEADER) + 90)
+        assert groups == [texts[:2], texts[2:3], texts[3:]]
+        assert render(texts[:1]) == texts[0]
+        assert render(texts[:2]).startswith(HEADER)
+
+    def test_transitions_are_sent_as_one_message(self, homework_module,
+                                                 digest_box):
+        box, clock = digest_box
+        bot = utils.RecordingBot()
+        homework_module.notify_statuses(
+            bot, [homework(1, 'approved'), homework(2, 'reviewing')]
+        )
+        assert bot.texts == [], (
+            'В режиме сводки уведомления откладываются до конца окна.'
+        )
+        assert len(box) == 2
+        clock.now = 60
+        homework_module.retry_undelivered(bot)
+        assert len(bot.texts) == 1
+        assert 'hw1' in bot.texts[0] and 'hw2' in bot.texts[0]
+        assert len(box) == 0
+
+    def test_urgent_status_bypasses_buffer(self, homework_module,
+                                           digest_box):
+        box, _ = digest_box
+        bot = utils.RecordingBot()
+        homework_module.notify_statuses(
+            bot, [homework(1, 'approved'), homework(2, 'rejected')]
+        )
+        assert len(bot.texts) == 1 and 'hw2' in bot.texts[0]
+        assert [entry.text for entry in box.buffered('default')] == [
+            homework_module.parse_status(homework(1, 'approved'))
+        ]
+
+    def test_full_digest_is_flushed_early(self, homework_module,
+                                          digest_box):
+        box, _ = digest_box
+        bot = utils.RecordingBot()
+        homework_module.notify_statuses(
+            bot, [homework(1, 'approved', name_length=2100),
+                  homework(2, 'reviewing', name_length=2100)]
+        )
+        homework_module.retry_undelivered(bot)
+        assert len(bot.texts) == 2, (
+            'Сводка, которая не помещается в сообщение, уходит досрочно.'
+        )
+        assert len(box) == 0
+
+    def test_urgent_status_supersedes_buffered_one(self, homework_module,
+                                                   digest_box):
+        box, clock = digest_box
+        bot = utils.RecordingBot()
+        homework_module.notify_statuses(
+            bot, [homework(1, 'reviewing'), homework(2, 'reviewing')]
+        )
+        homework_module.notify_statuses(bot, [homework(1, 'rejected')])
+        clock.now = 60
+        homework_module.retry_undelivered(bot)
+        assert bot.texts == [
+            homework_module.parse_status(homework(1, 'rejected')),
+            homework_module.parse_status(homework(2, 'reviewing')),
+        ], 'Сводка со старым статусом не должна прийти после нового.'
+        assert len(box) == 0
+
+    def test_drainer_sends_digest_when_window_ends(self, homework_module,
+                                                   digest_box):
+        import threading
+        from functools import partial
+        from leases import LeaseBackend, LeaseKeeper
+        from outbox import Drainer
+        box, clock = digest_box
+        bot = utils.RecordingBot()
+        keeper = LeaseKeeper(LeaseBackend(), ['default'], owner='me')
+        keeper.refresh()
+        homework_module.notify_statuses(
+            bot, [homework(1, 'approved'), homework(2, 'reviewing')]
+        )
+        sent = threading.Event()
+        retry = partial(homework_module.retry_held, keeper, bot)
+        drainer = Drainer(lambda: (retry(), sent.set()),
+                          interval=0.01).start()
+        try:
+            assert not sent.wait(0.05), (
+                'До конца окна сводка не отправляется.'
+            )
+            clock.now = 60
+            assert sent.wait(1), (
+                'Сводка уходит в конце окна, не дожидаясь опроса.'
+            )
+        finally:
+            drainer.stop()
+        assert len(bot.texts) == 1
+        assert len(box) == 0
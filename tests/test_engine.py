@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import requests
+
+import utils
+
+
+class TestPollingEngine:
+
+    def make_tenants(self, count):
+        from tenants import Tenant
+        return [Tenant(name=f'student{i}', practicum_token=f'token{i}',
+                       chat_id=str(1000 + i)) for i in range(count)]
+
+    def test_poll_uses_tenant_credentials(self, monkeypatch,
+                                          data_with_new_hw_status):
+        import engine
+        seen_headers = []
+
+        def mock_get(*args, headers=None, **kwargs):
+            seen_headers.append(headers['Authorization'])
+            return utils.MockResponseGET(data=data_with_new_hw_status)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = utils.MockTelegramBot()
+        polling = engine.PollingEngine(self.make_tenants(2),
+                                       bot_factory=lambda token: bot)
+
+        async def poll_all():
+            polling._semaphore = asyncio.Semaphore(2)
+            for tenant in polling.tenants:
+                await polling.poll_once(tenant)
+
+        polling.outbound.start()
+        asyncio.run(poll_all())
+        assert polling.outbound.drain(timeout=1)
+        polling.outbound.stop()
+        assert seen_headers == ['OAuth token0', 'OAuth token1'], (
+            'Каждый студент должен опрашиваться со своим токеном.'
+        )
+        assert bot.chat_id == '1001'
+        current_date = data_with_new_hw_status['current_date']
+        assert polling.states['student1'].timestamp == current_date
+
+    def test_in_flight_requests_are_bounded(self, monkeypatch,
+                                            random_timestamp):
+        import engine
+        lock = threading.Lock()
+        in_flight = peak = 0
+
+        def slow_get(*args, **kwargs):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return utils.MockResponseGET(random_timestamp=random_timestamp)
+
+        monkeypatch.setattr(requests, 'get', slow_get)
+        polling = engine.PollingEngine(
+            self.make_tenants(12), max_in_flight=3,
+            bot_factory=lambda token: utils.MockTelegramBot()
+        )
+
+        async def poll_all():
+            polling._semaphore = asyncio.Semaphore(polling.max_in_flight)
+            await asyncio.gather(*(polling.poll_once(tenant)
+                                   for tenant in polling.tenants))
+
+        asyncio.run(poll_all())
+        assert 1 < peak <= 3
+
+    def test_wheel_staggers_and_reschedules_polls(self, monkeypatch):
+        import engine
+        polled = []
+        polling = engine.PollingEngine(self.make_tenants(4), tick=0.01,
+                                       startup_window=0.04)
+
+        async def fake_poll_once(tenant):
+            polled.append(tenant.name)
+            polling.states[tenant.name].outcome = 'reviewing'
+
+        monkeypatch.setattr(polling, 'poll_once', fake_poll_once)
+        for state in polling.states.values():
+            monkeypatch.setattr(state.policy, 'next_delay',
+                                lambda outcome: 10)
+
+        async def drive():
+            driver = asyncio.create_task(polling._drive_wheel())
+            await asyncio.sleep(0.1)
+            driver.cancel()
+
+        asyncio.run(drive())
+        assert sorted(polled) == [f'student{i}' for i in range(4)]
+        assert len(polling.wheel) == 4, (
+            'После опроса студент должен снова попадать в колесо таймеров.'
+        )
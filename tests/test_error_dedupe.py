@@ -0,0 +1,81 @@
+import utils
+
+
+class TestFingerprint:
+
+    def test_volatile_parts_are_normalised(self):
+        from error_dedupe import fingerprint
+        assert fingerprint('Код ответа: 502') == fingerprint(
+            'Код ответа: 504'
+        )
+        assert fingerprint(
+            'HTTPSConnectionPool: Read timed out. (read timeout=10)'
+        ) == fingerprint(
+            'HTTPSConnectionPool: Read timed out. (read timeout=15.5)'
+        )
+        assert fingerprint('Код ответа: 502') != fingerprint(
+            'Ошибка при парсинге JSON данных'
+        )
+
+
+class TestErrorDeduplicator:
+
+    def test_repeats_are_suppressed_and_summarised(self):
+        from error_dedupe import ErrorDeduplicator
+        clock = utils.FakeClock()
+        dedupe = ErrorDeduplicator(ttl=3600, clock=clock)
+        assert dedupe.check('student', 'Код ответа: 502') == (
+            'Код ответа: 502'
+        )
+        for minute in range(1, 38):
+            clock.now = minute * 60
+            assert dedupe.check('student', f'Код ответа: 50{minute % 4}') \
+                is None
+        assert dedupe.check('other', 'Код ответа: 502') is not None, (
+            'Ошибки разных студентов не должны подавлять друг друга.'
+        )
+        clock.now = 3600
+        summary = dedupe.check('student', 'Код ответа: 503')
+        assert summary.startswith('Код ответа: 503')
+        assert 'ещё 37 раз' in summary
+
+    def test_lru_eviction(self):
+        from error_dedupe import ErrorDeduplicator
+        dedupe = ErrorDeduplicator(max_size=2, clock=utils.FakeClock())
+        dedupe.check('s', 'первая')
+        dedupe.check('s', 'вторая')
+        dedupe.check('s', 'первая')
+        dedupe.check('s', 'третья')
+        assert dedupe.check('s', 'первая') is None
+        assert dedupe.check('s', 'вторая') == 'вторая'
+
+
+class TestPollCycleErrors:
+
+    def test_alternating_errors_are_not_resent(self, monkeypatch,
+                                               homework_module,
+                                               random_timestamp):
+        sent = []
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: sent.append(message) or True)
+        responses = iter([
+            RuntimeError('Код ответа: 502'),
+            {'homeworks': [{'homework_name': 'hw', 'status': 'reviewing'}],
+             'current_date': random_timestamp},
+            RuntimeError('Код ответа: 503'),
+        ])
+
+        def mock_get_api_answer(timestamp):
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        monkeypatch.setattr(homework_module, 'get_api_answer',
+                            mock_get_api_answer)
+        for _ in range(3):
+            homework_module.poll_cycle(None, 0)
+        assert len(sent) == 2, (
+            'Повтор ошибки после сообщения о статусе не должен '
+            'отправляться в Telegram.'
+        )
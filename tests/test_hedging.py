@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import utils
+
+
+class TestHedgedCaller:
+
+    def test_hedge_wins_over_stalled_request(self):
+        from hedging import HedgedCaller
+        caller = HedgedCaller(max_workers=4)
+        release = threading.Event()
+        calls = []
+
+        def request():
+            calls.append(None)
+            if len(calls) == 1:
+                release.wait(1)
+                return 'медленный'
+            return 'быстрый'
+
+        caller.hedge_delay = lambda: 0.05
+        assert caller.call(request, deadline=1, hedge=True) == 'быстрый'
+        assert caller.hedges == 1
+        release.set()
+
+    def test_deadline_raises_timeout(self):
+        from hedging import HedgedCaller
+        caller = HedgedCaller(max_workers=2)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            caller.call(lambda: time.sleep(0.5), deadline=0.05)
+        assert time.monotonic() - started < 0.3
+
+    def test_hedge_delay_follows_p95(self):
+        from hedging import DEFAULT_HEDGE_DELAY, HedgedCaller
+        caller = HedgedCaller(max_workers=1)
+        assert caller.hedge_delay() == DEFAULT_HEDGE_DELAY
+        for millis in range(1, 101):
+            caller.tracker.record(millis / 100)
+        assert caller.hedge_delay() == pytest.approx(0.96)
+
+
+class TestGetApiAnswerTimeouts:
+
+    def test_timeouts_are_passed_to_requests(self, monkeypatch,
+                                             random_timestamp,
+                                             homework_module):
+        seen = {}
+
+        def mock_get(*args, **kwargs):
+            seen.update(kwargs)
+            return utils.MockResponseGET(random_timestamp=random_timestamp)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        homework_module.get_api_answer(random_timestamp)
+        assert seen['timeout'] == (homework_module.CONNECT_TIMEOUT,
+                                   homework_module.READ_TIMEOUT)
+
+    def test_stalled_api_raises_runtime_error(self, monkeypatch,
+                                              homework_module):
+        monkeypatch.setattr(homework_module, 'POLL_DEADLINE', 0.05)
+        monkeypatch.setattr(requests, 'get',
+                            lambda *args, **kwargs: time.sleep(0.3))
+        with pytest.raises(RuntimeError):
+            homework_module.get_api_answer(0)
@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+        self.server.cookies.append(self.headers.get('Cookie'))
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=student1; Path=/')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.cookies = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,),
+                              daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledSession:
+
+    def test_connections_are_reused(self, local_server):
+        import http_session
+        session = http_session.PooledSession(pool_maxsize=2)
+        for _ in range(5):
+            session.get(local_server.url).raise_for_status()
+        session.close()
+        assert session.stats() == {
+            'requests': 5, 'new_connections': 1, 'reused_connections': 4
+        }, 'Повторные запросы должны использовать открытое соединение.'
+
+    def test_get_api_answer_uses_installed_session(self, monkeypatch,
+                                                   local_server,
+                                                   homework_module):
+        import http_session
+        monkeypatch.setattr(homework_module, 'ENDPOINT', local_server.url)
+        session = http_session.install()
+        try:
+            assert homework_module.get_api_answer(0) == {
+                'homeworks': [], 'current_date': 1
+            }
+            assert session.stats()['requests'] == 1
+        finally:
+            http_session.uninstall()
+        assert http_session.installed() is None
+
+    def test_cookies_are_not_shared(self, local_server):
+        import http_session
+        session = http_session.PooledSession()
+        for _ in range(2):
+            session.get(local_server.url).raise_for_status()
+        session.close()
+        assert local_server.cookies == [None, None], (
+            'Cookies одного студента не должны уходить с чужими запросами.'
+        )
+        assert len(session.cookies) == 0
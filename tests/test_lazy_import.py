@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import sys
+
+
+class TestLazyModule:
+
+    def test_module_executes_on_first_attribute(self, tmp_path,
+                                                monkeypatch):
+        from lazy_import import lazy_module
+        (tmp_path / 'lazy_probe.py').write_text(
+            'import sys\nsys.lazy_probe_loaded = True\nVALUE = 42\n'
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.delitem(sys.modules, 'lazy_probe', raising=False)
+        module = lazy_module('lazy_probe')
+        assert not hasattr(sys, 'lazy_probe_loaded')
+        assert module.VALUE == 42
+        assert sys.lazy_probe_loaded
+        del sys.lazy_probe_loaded
+
+
+class TestColdStart:
+
+    def test_import_skips_heavy_dependencies(self):
+        from bench.import_time import measure
+        report = measure('homework', runs=1)
+        assert report['heavy_modules'] == [], (
+            'Импорт homework не должен загружать telegram, requests, '
+            'dotenv и http.server.'
+        )
+
+    def test_tokens_are_read_on_first_access(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, homework\n'
+             'loaded = "dotenv" in sys.modules\n'
+             'print(loaded, homework.TELEGRAM_CHAT_ID, "dotenv" in '
+             'sys.modules, homework.HEADERS["Authorization"])'],
+            cwd=root, check=True, capture_output=True, text=True,
+            env={**os.environ, 'TELEGRAM_CHAT_ID': '777',
+                 'PRACTICUM_TOKEN': 'secret'},
+        ).stdout.split()
+        assert output == ['False', '777', 'True', 'OAuth', 'secret']
+
+    def test_dotenv_is_read_before_feature_modules(self, tmp_path):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = str(tmp_path / 'homework.py')
+        shutil.copy(os.path.join(root, 'homework.py'), script)
+        (tmp_path / '.env').write_text(
+            'DIGEST_WINDOW=60\nLEASE_DB_PATH=leases.sqlite3\n'
+        )
+        env = {name: value for name, value in os.environ.items()
+               if name not in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN',
+                               'TELEGRAM_CHAT_ID')}
+        output = subprocess.run(
+            [sys.executable, '-c',
+             f'import runpy, sys\n'
+             f'sys.path.insert(1, {root!r})\n'
+             f'try:\n'
+             f'    runpy.run_path({script!r}, run_name="__main__")\n'
+             f'except SystemExit:\n'
+             f'    pass\n'
+             f'import digest, leases\n'
+             f'print(digest.WINDOW, leases.LEASE_DB_PATH)'],
+            cwd=tmp_path, check=True, capture_output=True, text=True,
+            env=env,
+        ).stdout.split()
+        assert output[-2:] == ['60.0', 'leases.sqlite3'], (
+            'Настройки из .env должны действовать и в модулях бота.'
+        )
@@ -0,0 +1,139 @@
+import asyncio
+
+import requests
+
+import utils
+
+
+class TestLeaseBackend:
+
+    def check_exclusive(self, first, second, clock):
+        assert first.acquire(['a', 'b'], 'one', ttl=5) == {'a', 'b'}
+        assert second.acquire(['a', 'b', 'c'], 'two', ttl=5) == {'c'}, (
+            'Аренду, которую держит другая реплика, захватить нельзя.'
+        )
+        clock.now += 3
+        assert first.acquire(['a'], 'one', ttl=5) == {'a'}
+        clock.now += 3
+        assert second.acquire(['a', 'b'], 'two', ttl=5) == {'b'}, (
+            'Просроченную аренду должна подхватить другая реплика.'
+        )
+        first.release(['a'], 'one')
+        assert second.acquire(['a'], 'two', ttl=5) == {'a'}
+
+    def test_memory_backend(self):
+        from leases import LeaseBackend
+        clock = utils.FakeClock(1000.0)
+        backend = LeaseBackend(clock=clock)
+        self.check_exclusive(backend, backend, clock)
+
+    def test_sqlite_backend_is_shared_between_connections(self, tmp_path):
+        from leases import SQLiteLeaseBackend
+        clock = utils.FakeClock(1000.0)
+        path = str(tmp_path / 'leases.sqlite3')
+        first = SQLiteLeaseBackend(path, clock=clock)
+        second = SQLiteLeaseBackend(path, clock=clock)
+        try:
+            self.check_exclusive(first, second, clock)
+        finally:
+            first.close()
+            second.close()
+
+
+class TestLeaseKeeper:
+
+    def test_failover_after_release(self):
+        from leases import LeaseBackend, LeaseKeeper
+        backend = LeaseBackend()
+        first = LeaseKeeper(backend, ['student'], owner='one').start()
+        second = LeaseKeeper(backend, ['student'], owner='two').start()
+        assert first.holds('student') and not second.holds('student')
+        assert first.gained('student')
+        assert not first.gained('student')
+        first.stop()
+        assert not first.holds('student')
+        second.refresh()
+        assert second.holds('student')
+        assert second.gained('student'), (
+            'Новый владелец должен перечитать состояние студента.'
+        )
+        second.stop()
+
+    def test_lease_is_lost_without_renewal(self):
+        from leases import LeaseBackend, LeaseKeeper
+        clock = utils.FakeClock(1000.0)
+        backend = LeaseBackend(clock=clock)
+        keeper = LeaseKeeper(backend, ['student'], owner='one', ttl=5,
+                             clock=clock)
+        keeper.refresh()
+        clock.now += 4.9
+        assert keeper.holds('student')
+        clock.now += 0.2
+        assert not keeper.holds('student'), (
+            'Без продления реплика должна перестать опрашивать студента.'
+        )
+
+
+class TestEngineLeases:
+
+    def test_engine_skips_tenants_held_elsewhere(self, monkeypatch,
+                                                 data_with_new_hw_status):
+        import engine
+        import polling_policy
+        from leases import LeaseBackend, LeaseKeeper
+        from tenants import Tenant
+        polled = []
+
+        def mock_get(*args, headers=None, **kwargs):
+            polled.append(headers['Authorization'])
+            return utils.MockResponseGET(data=data_with_new_hw_status)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        backend = LeaseBackend()
+        backend.acquire(['student1'], 'other', ttl=60)
+        keeper = LeaseKeeper(backend, ['student0', 'student1'], owner='me')
+        keeper.refresh()
+        tenant_list = [Tenant(name=f'student{i}', practicum_token=f'token{i}',
+                              chat_id=str(1000 + i)) for i in range(2)]
+        polling = engine.PollingEngine(
+            tenant_list, bot_factory=lambda token: utils.MockTelegramBot(),
+            keeper=keeper
+        )
+
+        async def poll_all():
+            polling._semaphore = asyncio.Semaphore(2)
+            for tenant in polling.tenants:
+                await polling.poll_once(tenant)
+
+        asyncio.run(poll_all())
+        assert polled == ['OAuth token0'], (
+            'Студента, чья аренда у другой реплики, опрашивать нельзя.'
+        )
+        assert polling.states['student1'].outcome == polling_policy.STANDBY
+
+    def test_new_replica_sends_messages_of_previous_one(self, monkeypatch,
+                                                        tmp_path):
+        import engine
+        import outbox
+        from leases import LeaseBackend, LeaseKeeper
+        from tenants import Tenant
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs:
+                            utils.MockResponseGET(data={'homeworks': [],
+                                                        'current_date': 1}))
+        previous = outbox.Outbox(str(tmp_path / 'outbox.a.jsonl'))
+        previous.fail(previous.add('student', 'не доставлено'))
+        previous.close()
+        box = outbox.install(outbox.Outbox(str(tmp_path / 'outbox.b.jsonl')))
+        keeper = LeaseKeeper(LeaseBackend(), ['student'], owner='b')
+        keeper.refresh()
+        polling = engine.PollingEngine(
+            [Tenant('student', 'token', '1000')],
+            bot_factory=lambda token: utils.MockTelegramBot(), keeper=keeper
+        )
+        polling._poll_sync(polling.tenants[0])
+        assert len(polling.outbound) == 1, (
+            'Сообщение, не доставленное прежней репликой, должна отправить '
+            'новая.'
+        )
+        assert len(box) == 1
+        assert len(outbox.Outbox(str(tmp_path / 'outbox.a.jsonl'))) == 0
@@ -0,0 +1,112 @@
+import io
+import logging
+import os
+
+import utils
+
+
+def make_record(level, message):
+    return logging.makeLogRecord({'levelno': level,
+                                  'levelname': logging.getLevelName(level),
+                                  'msg': message})
+
+
+class TestBoundedQueueHandler:
+
+    def test_overflow_drops_debug_and_evicts_for_errors(self):
+        from log_pipeline import BoundedQueueHandler
+        handler = BoundedQueueHandler(maxsize=2)
+        for number in range(3):
+            handler.emit(make_record(logging.DEBUG, f'debug {number}'))
+        handler.emit(make_record(logging.ERROR, 'error'))
+        messages = [handler.queue.get_nowait().msg for _ in range(2)]
+        assert messages == ['debug 1', 'error'], (
+            'Ошибка должна вытеснить самую старую запись очереди.'
+        )
+        assert handler.dropped == 2
+
+
+class TestSizeTimedRotatingFileHandler:
+
+    def test_rotates_by_size_without_overwriting(self, tmp_path):
+        from log_pipeline import SizeTimedRotatingFileHandler
+        path = tmp_path / 'logging_bot.log'
+        handler = SizeTimedRotatingFileHandler(str(path), max_bytes=50,
+                                               backup_count=10)
+        for number in range(10):
+            handler.handle(make_record(logging.INFO, f'{number:02}' * 20))
+        handler.close()
+        archives = [name for name in os.listdir(tmp_path)
+                    if name != 'logging_bot.log']
+        assert len(archives) == 9, (
+            'Каждая ротация по размеру должна создавать отдельный архив.'
+        )
+        assert path.read_text(encoding='utf-8') == '09' * 20 + '\n'
+
+
+class TestLogWriter:
+
+    def test_records_are_written_in_background(self):
+        from log_pipeline import BatchedStreamHandler, start
+        stream = io.StringIO()
+        writer = start([BatchedStreamHandler(stream)],
+                       logging.Formatter('%(message)s'), flush_interval=60)
+        logger = logging.getLogger('test_log_pipeline')
+        logger.propagate = False
+        logger.addHandler(writer.handler)
+        try:
+            for number in range(5):
+                logger.warning(f'запись {number}')
+        finally:
+            logger.removeHandler(writer.handler)
+            writer.stop()
+        assert stream.getvalue().splitlines() == [
+            f'запись {number}' for number in range(5)
+        ]
+
+
+class TestStructuredLog:
+
+    def test_json_record_carries_context_fields(self):
+        import json
+        from log_pipeline import ContextFilter, JsonFormatter
+        record = logging.makeLogRecord({
+            'levelno': logging.DEBUG, 'levelname': 'DEBUG',
+            'msg': 'Статус отправлен в telegram', 'stage': 'send_message',
+            'duration': 0.25, 'homework': '42',
+        })
+        ContextFilter(lambda: 'student').filter(record)
+        event = json.loads(JsonFormatter().format(record))
+        assert event['message'] == 'Статус отправлен в telegram'
+        assert event['tenant'] == 'student'
+        assert (event['stage'], event['duration'], event['homework']) == (
+            'send_message', 0.25, '42'
+        )
+
+    def test_sampling_keeps_share_of_each_event(self):
+        from log_pipeline import SamplingFilter, parse_sampling
+        sampling = SamplingFilter(parse_sampling('no_homeworks=0.1'))
+        kept = []
+        for _ in range(100):
+            record = make_record(logging.DEBUG, 'Домашних работ нет.')
+            record.event = 'no_homeworks'
+            if sampling.filter(record):
+                kept.append(record)
+        assert len(kept) == 10
+        assert kept[0].sampled == 0.1
+        assert sampling.filter(make_record(logging.DEBUG, 'другое'))
+
+    def test_repeats_are_suppressed_within_interval(self):
+        from log_pipeline import RepeatFilter
+        clock = utils.FakeClock()
+        repeats = RepeatFilter(interval=60, clock=clock)
+        assert repeats.filter(make_record(logging.ERROR, 'Код ответа: 502'))
+        for second in range(1, 6):
+            clock.now = second
+            assert not repeats.filter(
+                make_record(logging.ERROR, 'Код ответа: 502')
+            )
+        clock.now = 61
+        record = make_record(logging.ERROR, 'Код ответа: 502')
+        assert repeats.filter(record)
+        assert record.repeated == 5
@@ -0,0 +1,73 @@
+import urllib.request
+
+import pytest
+
+
+class TestHistogram:
+
+    def test_observations_fall_into_cumulative_buckets(self):
+        from metrics import Histogram
+        histogram = Histogram('latency', 'Длительность.', ('stage',),
+                              buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.labels('poll').observe(value)
+        lines = histogram.render()
+        assert 'latency_bucket{stage="poll",le="0.1"} 1' in lines
+        assert 'latency_bucket{stage="poll",le="1.0"} 3' in lines
+        assert 'latency_bucket{stage="poll",le="+Inf"} 4' in lines
+        assert 'latency_count{stage="poll"} 4' in lines
+
+
+class TestTimed:
+
+    def test_errors_are_counted_by_exception_type(self):
+        from exceptions import CurrentDateError
+        from metrics import STAGE_ERRORS, STAGE_LATENCY, timed
+
+        @timed('test_stage')
+        def stage(fail):
+            """Этап конвейера."""
+            if fail:
+                raise CurrentDateError('нет даты')
+            return 'ok'
+
+        calls = sum(STAGE_LATENCY.labels('test_stage').counts)
+        errors = STAGE_ERRORS.labels('test_stage', 'CurrentDateError').value
+        assert stage(False) == 'ok'
+        with pytest.raises(CurrentDateError):
+            stage(True)
+        assert sum(STAGE_LATENCY.labels('test_stage').counts) == calls + 2
+        assert STAGE_ERRORS.labels(
+            'test_stage', 'CurrentDateError'
+        ).value == errors + 1
+        assert stage.__doc__ == 'Этап конвейера.'
+
+    def test_pipeline_stages_are_instrumented(self, homework_module):
+        from metrics import STAGE_ERRORS
+        before = STAGE_ERRORS.labels('check_response', 'KeyError').value
+        with pytest.raises(KeyError):
+            homework_module.check_response({'current_date': 0})
+        assert STAGE_ERRORS.labels(
+            'check_response', 'KeyError'
+        ).value == before + 1
+
+
+class TestServe:
+
+    def test_endpoint_exposes_prometheus_text(self):
+        import metrics
+        server = metrics.serve(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/metrics', timeout=5
+            ) as response:
+                body = response.read().decode()
+                content_type = response.headers['Content-Type']
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert content_type.startswith('text/plain')
+        assert '# TYPE bot_stage_duration_seconds histogram' in body
+        assert 'bot_outbox_pending 0.0' in body
+        assert '# TYPE bot_errors_suppressed_total counter' in body
@@ -0,0 +1,141 @@
+import logging
+
+import telegram
+
+import utils
+
+
+def send_all(queue, clock, steps=100, step=0.1):
+    """Разбирает очередь в текущем потоке, продвигая фальшивые часы."""
+    for _ in range(steps):
+        with queue._condition:
+            if not queue._pending:
+                return
+            queue._condition.wait = lambda timeout=None: None
+            taken = queue._take()
+        if taken is None:
+            clock.now += step
+            continue
+        queue._dispatch(*taken)
+
+
+class TestTokenBucket:
+
+    def test_bucket_limits_rate_and_honours_pause(self):
+        from outbound import TokenBucket
+        bucket = TokenBucket(rate=2, capacity=1, now=0)
+        assert bucket.delay(0) == 0
+        bucket.consume(0)
+        assert bucket.delay(0) == 0.5
+        bucket.pause(1, 3)
+        assert bucket.delay(1) == 3
+
+
+class TestOutboundQueue:
+
+    def test_messages_for_same_chat_are_coalesced(self, monkeypatch,
+                                                  homework_module):
+        from outbound import OutboundQueue
+        clock = utils.FakeClock()
+        bot = utils.RecordingBot()
+        queue = OutboundQueue(clock=clock)
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '1')
+        queue.put('1', 'первое', bot)
+        queue.put('1', 'второе', bot)
+        queue.put('2', 'третье', bot)
+        assert len(queue) == 2
+        send_all(queue, clock)
+        assert queue.coalesced == 1
+        assert [text for _, text in bot.sent] == ['первое\n\nвторое',
+                                                   'третье']
+
+    def test_per_chat_rate_is_respected(self):
+        from outbound import OutboundQueue
+        clock = utils.FakeClock()
+        sent_at = []
+        queue = OutboundQueue(sender=lambda bot, text: sent_at.append(
+            clock.now), chat_rate=1, clock=clock)
+        for number in range(3):
+            queue.put('1', str(number), utils.RecordingBot())
+        send_all(queue, clock)
+        assert len(sent_at) == 3
+        assert sent_at[1] - sent_at[0] >= 1
+        assert sent_at[2] - sent_at[1] >= 1
+
+    def test_retry_after_pauses_chat(self):
+        from outbound import OutboundQueue
+        clock = utils.FakeClock()
+        attempts = []
+
+        def flaky_sender(bot, text):
+            attempts.append(clock.now)
+            if len(attempts) == 1:
+                bot.send_message('1', text)
+
+        class FloodedBot(utils.RecordingBot):
+            def send_message(self, *args, **kwargs):
+                raise telegram.error.RetryAfter(5)
+
+        queue = OutboundQueue(sender=flaky_sender, clock=clock)
+        queue.put('1', 'текст', FloodedBot())
+        send_all(queue, clock)
+        assert len(attempts) == 2
+        assert attempts[1] - attempts[0] >= 5, (
+            'Повторная отправка должна ждать retry_after.'
+        )
+
+    def test_background_thread_drains_queue(self):
+        from outbound import OutboundQueue, QueueingBot
+        bot = utils.RecordingBot()
+        queue = OutboundQueue(sender=lambda bot, text: bot.send_message(
+            '1', text))
+        queue.start()
+        QueueingBot(bot, queue).send_message('1', 'привет')
+        assert queue.drain(timeout=1)
+        queue.stop()
+        assert bot.sent == [('1', 'привет')]
+
+    def test_delivery_acks_outbox_entries(self, homework_module):
+        import outbox
+        from outbound import OutboundQueue, QueueingBot
+        box = outbox.current()
+        clock = utils.FakeClock()
+        results = iter([False, True])
+        queue = OutboundQueue(sender=lambda bot, text: next(results),
+                              clock=clock)
+        queue_bot = QueueingBot(utils.RecordingBot(), queue)
+        homework_module.deliver(queue_bot, 'статус')
+        assert len(box) == 1
+        send_all(queue, clock)
+        assert len(box) == 1, 'Неудачная доставка не подтверждает запись.'
+        assert box.due(homework_module.DEFAULT_TENANT) == [], (
+            'Повтор должен ждать паузу.'
+        )
+        box._clock = lambda: 10 ** 6
+        homework_module.retry_undelivered(queue_bot)
+        send_all(queue, clock)
+        assert len(box) == 0
+
+    def test_only_real_delivery_is_timed_and_logged(self, caplog,
+                                                    homework_module):
+        from metrics import STAGE_LATENCY
+        from outbound import OutboundQueue, QueueingBot
+        latency = STAGE_LATENCY.labels('send_message')
+        clock = utils.FakeClock()
+        queue = OutboundQueue(clock=clock)
+        bot = utils.RecordingBot()
+        samples = sum(latency.counts)
+
+        def sent_records():
+            return [record for record in caplog.records
+                    if getattr(record, 'event', None) == 'message_sent']
+
+        with caplog.at_level(logging.DEBUG):
+            homework_module.deliver(QueueingBot(bot, queue), 'статус')
+            assert sum(latency.counts) == samples and not sent_records(), (
+                'Постановка в очередь не должна считаться отправкой.'
+            )
+            send_all(queue, clock)
+        assert bot.texts == ['статус']
+        assert sum(latency.counts) == samples + 1
+        assert len(sent_records()) == 1
@@ -0,0 +1,167 @@
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'outbox.jsonl')
+
+
+class TestOutbox:
+
+    def test_unacked_messages_survive_restart(self, journal_path):
+        from outbox import Outbox
+        box = Outbox(journal_path)
+        delivered = box.add('student', 'доставлено')
+        box.add('student', 'не доставлено')
+        box.ack(delivered)
+        box.close()
+
+        restored = Outbox(journal_path)
+        assert [entry.text for entry in restored.due('student')] == [
+            'не доставлено'
+        ]
+        with open(journal_path, encoding='utf-8') as journal:
+            assert len(journal.readlines()) == 1, (
+                'После восстановления журнал должен содержать только '
+                'неподтверждённые сообщения.'
+            )
+        restored.close()
+
+    def test_failed_send_backs_off(self):
+        from outbox import Outbox
+        clock = utils.FakeClock()
+        box = Outbox(base_delay=5, max_delay=20, clock=clock)
+        entry = box.add('student', 'текст')
+        for expected in (5, 10, 20, 20):
+            assert not box.attempt(entry, lambda: False)
+            assert entry.next_attempt - clock.now == expected
+            assert box.due('student') == []
+            clock.now = entry.next_attempt
+            assert box.due('student') == [entry]
+        assert box.attempt(entry, lambda: True)
+        assert len(box) == 0
+
+    def test_journal_is_compacted(self, journal_path):
+        from outbox import Outbox
+        box = Outbox(journal_path, compact_threshold=10)
+        for number in range(25):
+            box.ack(box.add('student', str(number)))
+        box.add('student', 'последнее')
+        box.close()
+        with open(journal_path, encoding='utf-8') as journal:
+            assert len(journal.readlines()) <= 11
+
+    def test_entries_sent_together_are_acked_together(self):
+        from outbox import Outbox, handoff
+        clock = utils.FakeClock()
+        box = Outbox(clock=clock)
+        first = box.add('student', 'первое', delay=60)
+        second = box.add('student', 'второе', delay=60)
+        assert box.buffered('student') == [first, second]
+        assert box.due('student') == []
+        box.release('student')
+        entries = box.due('student')
+        assert entries == [first, second]
+        assert box.attempt_all(entries, lambda: True)
+        assert len(box) == 0
+        taken = []
+        third = box.add('student', 'третье')
+        box.attempt_all([third], lambda: bool(taken.extend(handoff())))
+        assert taken == [third] and len(box) == 1, (
+            'Исход записей, забранных через handoff, отмечает отправитель.'
+        )
+
+    def test_new_owner_adopts_entries_of_other_journals(self, tmp_path):
+        from outbox import Outbox
+        old_shard = Outbox(str(tmp_path / 'outbox.shard3.jsonl'))
+        old_shard.add('moved', 'текст', chat_id='mentor')
+        old_shard.add('stays', 'другой')
+        old_shard.close()
+        new_shard = Outbox(str(tmp_path / 'outbox.shard0.jsonl'))
+        assert new_shard.reload('moved') == 1
+        assert [(entry.text, entry.chat_id)
+                for entry in new_shard.due('moved')] == [('текст', 'mentor')]
+        new_shard.close()
+        assert Outbox(str(tmp_path / 'outbox.shard0.jsonl')).reload(
+            'moved'
+        ) == 0, 'Перенесённое сообщение не должно переноситься повторно.'
+        restored = Outbox(str(tmp_path / 'outbox.shard3.jsonl'))
+        assert [entry.tenant for entry in restored.due('moved')] == []
+        assert len(restored) == 1
+
+    def test_compaction_keeps_entries_moved_away(self, tmp_path):
+        from outbox import Outbox
+        path = str(tmp_path / 'outbox.a.jsonl')
+        old = Outbox(path, compact_threshold=1)
+        old.add('student', 'текст')
+        new = Outbox(str(tmp_path / 'outbox.b.jsonl'))
+        assert new.reload('student') == 1
+        old.ack(old.add('other', 'сжатие журнала'))
+        old.close()
+        assert len(Outbox(path)) == 0, (
+            'Сжатие журнала не должно возвращать перенесённые сообщения.'
+        )
+
+    def test_gain_reads_only_appended_entries(self, tmp_path,
+                                              monkeypatch):
+        import outbox
+        other = outbox.Outbox(str(tmp_path / 'outbox.a.jsonl'))
+        other.add('first', 'до запуска')
+        box = outbox.Outbox(str(tmp_path / 'outbox.b.jsonl'))
+        assert box.reload('first') == 1
+
+        def full_read(path):
+            raise AssertionError(f'Журнал {path} перечитан целиком.')
+
+        monkeypatch.setattr(outbox, 'read_journal', full_read)
+        other.ack(other.add('second', 'уже доставлено'))
+        other.add('third', 'после запуска')
+        assert box.reload('second') == 0
+        assert box.reload('third') == 1, (
+            'Сообщения, записанные после запуска, тоже переносятся.'
+        )
+        assert [entry.text for entry in box.due('third')] == ['после запуска']
+
+    def test_compacted_sibling_journal_is_read_again(self, tmp_path):
+        from outbox import Outbox
+        other = Outbox(str(tmp_path / 'outbox.a.jsonl'), compact_threshold=1)
+        other.add('student', 'текст')
+        box = Outbox(str(tmp_path / 'outbox.b.jsonl'))
+        assert box.reload('nobody') == 0
+        other.ack(other.add('other', 'сжатие журнала'))
+        assert box.reload('student') == 1
+
+    def test_old_owner_forgets_entries_moved_away(self, tmp_path):
+        from outbox import Outbox
+        old = Outbox(str(tmp_path / 'outbox.a.jsonl'))
+        old.add('student', 'текст')
+        assert old.reload('student') == 0
+        new = Outbox(str(tmp_path / 'outbox.b.jsonl'))
+        assert new.reload('student') == 1
+        old.reload('other')
+        assert len(old) == 0, (
+            'Перенесённое сообщение не должен отправлять прежний владелец.'
+        )
+
+    def test_drainer_retries_between_poll_cycles(self):
+        import threading
+        import outbox
+        box = outbox.install(outbox.Outbox(base_delay=0.05))
+        box.fail(box.add('student', 'текст'))
+        retried = threading.Event()
+
+        def retry():
+            for entry in box.due('student'):
+                box.ack(entry)
+            retried.set()
+
+        drainer = outbox.Drainer(retry, interval=0.01).start()
+        try:
+            assert retried.wait(1), (
+                'Повтор не должен ждать следующего цикла опроса.'
+            )
+        finally:
+            drainer.stop()
+        assert len(box) == 0
@@ -0,0 +1,50 @@
+import utils
+
+
+class TestPollPolicy:
+
+    def test_reviewing_polls_more_often(self):
+        from polling_policy import PollPolicy, REVIEWING
+        policy = PollPolicy(base=600, reviewing=120, jitter=0)
+        assert policy.next_delay(REVIEWING) == 120
+        assert policy.next_delay(REVIEWING) == 120
+
+    def test_idle_and_errors_back_off(self):
+        from polling_policy import ERROR, IDLE, PollPolicy
+        policy = PollPolicy(base=600, max_idle=1800, max_error=3600,
+                            jitter=0)
+        idle = [policy.next_delay(IDLE) for _ in range(5)]
+        assert idle[0] == 600, 'Первая пауза без работ равна базовой.'
+        assert idle == sorted(idle) and idle[-1] == 1800
+        errors = [policy.next_delay(ERROR) for _ in range(5)]
+        assert errors == [600, 1200, 2400, 3600, 3600]
+        assert policy.next_delay(IDLE) == 600
+
+    def test_standby_ignores_streaks_and_budget(self):
+        from polling_policy import (ERROR, STANDBY, PollPolicy,
+                                    RequestBudget)
+        budget = RequestBudget(3600, clock=utils.FakeClock())
+        policy = PollPolicy(base=600, standby=5, jitter=0, budget=budget)
+        assert policy.next_delay(STANDBY) == 5
+        assert policy.next_delay(STANDBY) == 5, (
+            'Пока студента опрашивает другая реплика, слоты бюджета '
+            'не расходуются.'
+        )
+        assert policy.next_delay(ERROR) == 600
+
+    def test_jitter_stays_in_bounds(self):
+        from polling_policy import IDLE, PollPolicy
+        low = PollPolicy(base=600, jitter=0.1, rng=lambda: 0.0)
+        high = PollPolicy(base=600, jitter=0.1, rng=lambda: 1.0)
+        assert low.next_delay(IDLE) == 540
+        assert high.next_delay(IDLE) == 660
+
+    def test_budget_spreads_requests(self):
+        from polling_policy import IDLE, PollPolicy, RequestBudget
+        budget = RequestBudget(requests_per_hour=3600, clock=utils.FakeClock())
+        policies = [PollPolicy(base=10, jitter=0, budget=budget)
+                    for _ in range(3)]
+        delays = [policy.next_delay(IDLE) for policy in policies]
+        assert delays == [10, 11, 12], (
+            'Общий бюджет должен разносить запросы по времени.'
+        )
@@ -0,0 +1,55 @@
+import os
+import signal
+import tracemalloc
+
+
+def busy_cycle():
+    return [str(number) * 10 for number in range(2000)]
+
+
+class TestCycleProfiler:
+
+    def test_window_dumps_functions_and_allocations(self, tmp_path):
+        from profiling import CycleProfiler
+        profiler = CycleProfiler(str(tmp_path), cycles=2)
+        kept = []
+        for _ in range(3):
+            with profiler.cycle():
+                kept.append(busy_cycle())
+        assert profiler.profiled == 2, (
+            'Профилироваться должно ровно заданное число циклов.'
+        )
+        files = sorted(os.listdir(tmp_path))
+        assert [os.path.splitext(name)[1] for name in files] == ['.prof',
+                                                                  '.txt']
+        with open(tmp_path / files[1], encoding='utf-8') as summary:
+            text = summary.read()
+        assert 'busy_cycle' in text
+        assert 'Места выделения памяти:' in text and 'test_profiling.py' in text
+        assert not tracemalloc.is_tracing()
+
+    def test_profiler_is_idle_by_default(self, tmp_path):
+        from profiling import CycleProfiler
+        profiler = CycleProfiler(str(tmp_path), cycles=0)
+        with profiler.cycle():
+            busy_cycle()
+        profiler.uninstall()
+        assert profiler.profiled == 0
+        assert os.listdir(tmp_path) == []
+
+    def test_signal_opens_window_from_next_cycle(self, tmp_path):
+        from profiling import CycleProfiler
+        profiler = CycleProfiler(str(tmp_path), cycles=0, signal_cycles=3)
+        profiler.install(signal.SIGUSR2)
+        try:
+            os.kill(os.getpid(), signal.SIGUSR2)
+            assert profiler.requested == 3
+            with profiler.cycle():
+                busy_cycle()
+            assert profiler.remaining == 2
+        finally:
+            profiler.uninstall()
+        assert signal.getsignal(signal.SIGUSR2) is signal.SIG_DFL
+        assert len(os.listdir(tmp_path)) == 2, (
+            'Незаконченное окно сохраняется при остановке бота.'
+        )
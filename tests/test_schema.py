@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+
+class TestSchema:
+
+    @pytest.mark.parametrize('response, error', [
+        ([], TypeError),
+        ({'current_date': 1}, KeyError),
+        ({'homeworks': None, 'current_date': 1}, KeyError),
+        ({'homeworks': {}, 'current_date': 1}, TypeError),
+        ({'homeworks': []}, 'CurrentDateError'),
+        ({'homeworks': [], 'current_date': '1'}, 'CurrentDateError'),
+    ])
+    def test_response_errors_keep_types(self, homework_module, response,
+                                        error):
+        from exceptions import CurrentDateError
+        if error == 'CurrentDateError':
+            error = CurrentDateError
+        with pytest.raises(error):
+            homework_module.check_response(response)
+
+    def test_homework_rules_run_in_order(self, homework_module):
+        with pytest.raises(KeyError):
+            homework_module.parse_status({'status': 'approved'})
+        with pytest.raises(ValueError, match='unknown'):
+            homework_module.parse_status({'status': 'unknown'})
+        assert homework_module.parse_status(
+            {'status': 'approved', 'homework_name': 'hw'}
+        ).startswith('Изменился статус проверки работы "hw".')
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class TestFastJson:
+
+    def test_decoder_reads_content_bytes(self, monkeypatch):
+        import fastjson
+        calls = []
+
+        def decoder(content):
+            calls.append(content)
+            return json.loads(content)
+
+        monkeypatch.setattr(fastjson, '_decoder', decoder)
+        assert fastjson.decode(FakeResponse(b'{"homeworks": []}')) == {
+            'homeworks': []
+        }
+        assert calls == [b'{"homeworks": []}']
+
+    def test_decode_errors_become_json_errors(self, monkeypatch):
+        import fastjson
+
+        def decoder(content):
+            raise ValueError('bad json')
+
+        monkeypatch.setattr(fastjson, '_decoder', decoder)
+        with pytest.raises(json.JSONDecodeError):
+            fastjson.decode(FakeResponse(b'{'))
+
+    def test_orjson_is_used_when_installed(self):
+        orjson = pytest.importorskip('orjson')
+        import fastjson
+        assert fastjson.decoder() is orjson.loads
@@ -0,0 +1,112 @@
+import asyncio
+import inspect
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+
+def send_signal_later(signum, delay=0.1):
+    timer = threading.Timer(delay, os.kill, (os.getpid(), signum))
+    timer.start()
+    return timer
+
+
+class TestShutdownSignal:
+
+    def test_signal_interrupts_idle_sleep(self):
+        from exceptions import ShutdownRequested
+        from shutdown import ShutdownSignal
+        stop = ShutdownSignal().install(signals=(signal.SIGUSR2,))
+        try:
+            send_signal_later(signal.SIGUSR2)
+            started = time.monotonic()
+            with pytest.raises(ShutdownRequested):
+                with stop.interruptible():
+                    time.sleep(5)
+        finally:
+            stop.uninstall()
+        assert time.monotonic() - started < 1, (
+            'Сигнал остановки должен прерывать паузу между опросами сразу.'
+        )
+        assert stop.signal == signal.SIGUSR2
+
+    def test_signal_during_work_only_sets_flag(self):
+        from exceptions import ShutdownRequested
+        from shutdown import ShutdownSignal
+        stop = ShutdownSignal().install(signals=(signal.SIGUSR2,))
+        try:
+            os.kill(os.getpid(), signal.SIGUSR2)
+            time.sleep(0.01)
+            assert stop.requested
+            with pytest.raises(ShutdownRequested):
+                with stop.interruptible():
+                    pytest.fail('Пауза не должна начинаться после сигнала.')
+        finally:
+            stop.uninstall()
+
+
+class TestMainShutdown:
+
+    def test_sigterm_stops_main_and_flushes_state(self, monkeypatch,
+                                                  homework_module):
+        import state_store
+        monkeypatch.setattr(
+            homework_module, 'poll_cycle',
+            lambda bot, timestamp: homework_module.CycleResult(
+                1000198000, 'idle'
+            )
+        )
+        monkeypatch.setattr(homework_module.telegram, 'Bot',
+                            lambda **kwargs: None)
+        flushed = []
+        monkeypatch.setattr(state_store.SQLiteStateStore, 'flush',
+                            lambda store: flushed.append(store))
+        previous = signal.getsignal(signal.SIGTERM)
+        send_signal_later(signal.SIGTERM, delay=0.2)
+        started = time.monotonic()
+        inspect.unwrap(homework_module.main)()
+        assert time.monotonic() - started < 1.5
+        assert flushed, 'Перед выходом состояние нужно сбросить на диск.'
+        assert signal.getsignal(signal.SIGTERM) == previous
+
+
+class TestEngineShutdown:
+
+    def test_stop_drains_queue_before_exit(self):
+        import engine
+        import utils
+        from outbound import OutboundQueue
+        polling = engine.PollingEngine([], bot_factory=lambda token: None)
+        bot = utils.MockTelegramBot()
+        delivered = []
+        polling.outbound = OutboundQueue(
+            sender=lambda bot, text: delivered.append(text) or True
+        )
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            polling.outbound.put('1', 'до остановки', bot)
+            loop.call_later(0.05, polling.stop)
+            await polling.run(deadline=1)
+
+        asyncio.run(run())
+        assert delivered == ['до остановки']
+
+    def test_profiling_signal_does_not_stop_engine(self, caplog):
+        import engine
+        import profiling
+        polling = engine.PollingEngine([], bot_factory=lambda token: None)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.02, os.kill, os.getpid(), profiling.SIGNAL)
+            loop.call_later(0.1, polling.stop)
+            await polling.run(deadline=1)
+
+        asyncio.run(run())
+        assert profiling.UNSUPPORTED in caplog.text, (
+            'В режиме нескольких студентов SIGUSR1 только пишется в журнал.'
+        )
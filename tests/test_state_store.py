@@ -0,0 +1,147 @@
+import inspect
+import time
+
+import pytest
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'state.sqlite3')
+
+
+class TestSQLiteStateStore:
+
+    def test_state_survives_restart(self, db_path):
+        import state_store
+        store = state_store.SQLiteStateStore(db_path)
+        store.set_cursor('student', 1000198000)
+        store.set_status('student', '42', 'reviewing')
+        store.close()
+
+        reopened = state_store.SQLiteStateStore(db_path)
+        assert reopened.get_cursor('student') == 1000198000
+        assert reopened.get_statuses('student') == {'42': 'reviewing'}
+        reopened.close()
+
+    def test_writes_are_batched(self, db_path):
+        import state_store
+        store = state_store.SQLiteStateStore(db_path, batch_size=3,
+                                             flush_interval=60)
+        journal_mode = store._connection.execute(
+            'PRAGMA journal_mode'
+        ).fetchone()[0]
+        assert journal_mode == 'wal'
+
+        store.set_cursor('a', 1)
+        store.set_cursor('b', 2)
+        other = state_store.SQLiteStateStore(db_path)
+        assert other.get_cursor('a') is None, (
+            'Запись должна откладываться до набора пачки.'
+        )
+        assert store.get_cursor('a') == 1
+        store.set_status('a', 'hw', 'approved')
+        assert other.get_cursor('b') == 2
+        assert other.get_statuses('a') == {'hw': 'approved'}
+        other.close()
+        store.close()
+
+
+class TestMainUsesStateStore:
+
+    def test_main_resumes_from_saved_cursor(self, monkeypatch,
+                                            homework_module):
+        import state_store
+        store = state_store.SQLiteStateStore(homework_module.STATE_DB_PATH)
+        store.set_cursor(homework_module.DEFAULT_TENANT, 1000198000)
+        store.close()
+
+        requested = []
+
+        class StopPolling(Exception):
+            pass
+
+        def mock_poll_cycle(bot, timestamp):
+            requested.append(timestamp)
+            return timestamp, 'idle'
+
+        def stop_sleep(seconds):
+            raise StopPolling
+
+        monkeypatch.setattr(homework_module, 'poll_cycle', mock_poll_cycle)
+        monkeypatch.setattr(homework_module.telegram, 'Bot',
+                            lambda **kwargs: None)
+        monkeypatch.setattr(time, 'sleep', stop_sleep)
+        with pytest.raises(StopPolling):
+            inspect.unwrap(homework_module.main)()
+        assert requested == [1000198000]
+
+
+class TestStatusIndex:
+
+    def test_only_transitions_are_notified(self, monkeypatch,
+                                           homework_module, random_timestamp):
+        sent = []
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: sent.append(message) or True)
+
+        def poll(homeworks):
+            monkeypatch.setattr(homework_module, 'get_api_answer',
+                                lambda timestamp: {
+                                    'homeworks': homeworks,
+                                    'current_date': random_timestamp})
+            sent.clear()
+            homework_module.poll_cycle(None, 0)
+            return list(sent)
+
+        first = {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'}
+        second = {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}
+        assert len(poll([first, second])) == 2, (
+            'Уведомление должно отправляться по каждой работе из ответа.'
+        )
+        assert poll([first, second]) == []
+        approved = dict(first, status='approved')
+        messages = poll([approved, second])
+        assert len(messages) == 1 and 'hw1' in messages[0]
+        assert poll([second, approved]) == [], (
+            'Порядок работ в ответе не должен вызывать повторных отправок.'
+        )
+
+    def test_failed_send_stays_in_outbox(self, monkeypatch,
+                                         homework_module):
+        import outbox
+        import state_store
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: False)
+        homework = {'homework_name': 'hw1', 'status': 'approved'}
+        homework_module.notify_statuses(None, [homework])
+        index = state_store.current().status_index(
+            homework_module.DEFAULT_TENANT
+        )
+        assert index.get('hw1') == 'approved'
+        assert len(outbox.current()) == 1, (
+            'Недоставленное уведомление должно остаться в журнале.'
+        )
+
+    def test_bad_homework_does_not_block_others(self, monkeypatch,
+                                                homework_module):
+        sent = []
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: sent.append(message) or True)
+        monkeypatch.setattr(homework_module, 'get_api_answer',
+                            lambda timestamp: {
+                                'homeworks': [
+                                    {'id': 1, 'status': 'unknown'},
+                                    {'id': 7, 'homework_name': 'hw7'},
+                                    {'id': 2, 'homework_name': 'hw2',
+                                     'status': 'approved'},
+                                ],
+                                'current_date': 500})
+        timestamp, outcome = homework_module.poll_cycle(None, 0)
+        assert timestamp == 500 and outcome != 'error', (
+            'Ошибка в одной работе не должна останавливать курсор.'
+        )
+        assert len(sent) == 3 and 'hw2' in sent[2]
+        assert all(message.startswith('Сбой в разборе домашней работы')
+                   for message in sent[:2]), (
+            'Работа без статуса должна попадать в отчёт об ошибке.'
+        )
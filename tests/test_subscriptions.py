@@ -0,0 +1,120 @@
+import threading
+
+import telegram
+
+import utils
+
+
+class ChatsBot(utils.RecordingBot):
+
+    def __init__(self, failing=(), **kwargs):
+        super().__init__(**kwargs)
+        self.failing = set(failing)
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if chat_id in self.failing:
+            raise telegram.error.NetworkError('нет связи')
+        super().send_message(chat_id, text, **kwargs)
+
+
+class TestSubscriptions:
+
+    def test_store_keeps_subscriptions(self, tmp_path):
+        import state_store
+        path = str(tmp_path / 'state.sqlite3')
+        for store in (state_store.StateStore(),
+                      state_store.SQLiteStateStore(path)):
+            store.subscribe('student', 'mentor')
+            store.subscribe('student', 'group')
+            store.subscribe('student', 'mentor')
+            store.unsubscribe('student', 'group')
+            assert store.get_subscriptions('student') == ['mentor']
+            store.close()
+        reopened = state_store.SQLiteStateStore(path)
+        assert reopened.get_subscriptions('student') == ['mentor']
+        reopened.close()
+
+    def test_cli_adds_and_lists_subscribers(self, tmp_path):
+        import subscriptions
+        path = str(tmp_path / 'state.sqlite3')
+        subscriptions.main(['add', 'student', '100', '--db', path])
+        assert subscriptions.main(['list', 'student', '--db', path]) == [
+            '100'
+        ]
+
+    def test_event_reaches_every_subscriber(self, homework_module):
+        import state_store
+        store = state_store.current()
+        for chat_id in ('mentor', 'group', homework_module.TELEGRAM_CHAT_ID):
+            store.subscribe(homework_module.DEFAULT_TENANT, chat_id)
+        bot = ChatsBot()
+        homework_module.notify_statuses(bot, [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+        ])
+        chats = sorted(chat_id for chat_id, _ in bot.sent)
+        assert chats == sorted([homework_module.TELEGRAM_CHAT_ID, 'mentor',
+                                'group']), (
+            'Уведомление должно уйти студенту и каждому подписчику один раз.'
+        )
+        assert len({text for _, text in bot.sent}) == 1
+
+    def test_errors_go_to_own_chat_only(self, homework_module):
+        import state_store
+        state_store.current().subscribe(homework_module.DEFAULT_TENANT,
+                                        'mentor')
+        bot = ChatsBot()
+        assert homework_module.report_error(bot, 'Сбой в работе программы')
+        assert [chat_id for chat_id, _ in bot.sent] == [
+            homework_module.TELEGRAM_CHAT_ID
+        ], 'Сообщения о сбоях подписчикам не рассылаются.'
+
+    def test_fan_out_is_concurrent(self, homework_module):
+        import fanout
+        import state_store
+        store = state_store.current()
+        for number in range(fanout.WORKERS - 1):
+            store.subscribe(homework_module.DEFAULT_TENANT, f'chat{number}')
+        barrier = threading.Barrier(fanout.WORKERS, timeout=1)
+        bot = ChatsBot()
+        original = bot.send_message
+
+        def send_together(chat_id=None, text=None, **kwargs):
+            barrier.wait()
+            original(chat_id, text, **kwargs)
+
+        bot.send_message = send_together
+        assert homework_module.deliver(bot, 'статус'), (
+            'Рассылка подписчикам должна идти параллельно.'
+        )
+        assert len(bot.sent) == fanout.WORKERS
+
+    def test_failed_chat_is_retried_alone(self, homework_module):
+        import outbox
+        import state_store
+        clock = utils.FakeClock()
+        box = outbox.install(outbox.Outbox(clock=clock))
+        state_store.current().subscribe(homework_module.DEFAULT_TENANT,
+                                        'mentor')
+        bot = ChatsBot(failing={'mentor'})
+        assert not homework_module.deliver(bot, 'статус')
+        assert len(bot.sent) == 1 and len(box) == 1
+        clock.now = 60
+        bot.failing.clear()
+        bot.sent.clear()
+        homework_module.retry_undelivered(bot)
+        assert bot.sent == [('mentor', 'статус')], (
+            'Повторно сообщение должно уйти только в чат, где не доставлено.'
+        )
+        assert len(box) == 0
+
+    def test_journal_keeps_chat(self, tmp_path):
+        from outbox import Outbox
+        path = str(tmp_path / 'outbox.jsonl')
+        box = Outbox(path)
+        box.add('student', 'текст', chat_id='mentor')
+        box.close()
+        restored = Outbox(path)
+        assert [entry.chat_id for entry in restored.due('student')] == [
+            'mentor'
+        ]
+        restored.close()
@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import utils
+
+
+def crash(path, shard, shards):
+    os._exit(3)
+
+
+def idle(path, shard, shards):
+    time.sleep(30)
+
+
+def record_usr1(path, shard, shards):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: open(
+        os.path.join(path, f'usr1-{shard}'), 'w'
+    ).close())
+    time.sleep(30)
+
+
+def wait_exit(supervisor, timeout=1.0):
+    expires = time.monotonic() + timeout
+    for process in supervisor.processes.values():
+        process.join(max(expires - time.monotonic(), 0))
+
+
+class TestHashRing:
+
+    def test_keys_spread_evenly(self):
+        from supervisor import HashRing
+        ring = HashRing(range(4))
+        shards = ring.assign(f'student-{number}' for number in range(4000))
+        assert sorted(shards) == [0, 1, 2, 3]
+        for keys in shards.values():
+            assert 700 < len(keys) < 1300, (
+                'Студенты должны распределяться по шардам примерно поровну.'
+            )
+
+    def test_new_node_takes_keys_only_from_others(self):
+        from supervisor import HashRing
+        keys = [f'student-{number}' for number in range(4000)]
+        before = HashRing(range(4))
+        after = HashRing(range(5))
+        moved = [key for key in keys
+                 if before.node_for(key) != after.node_for(key)]
+        assert all(after.node_for(key) == 4 for key in moved), (
+            'При добавлении шарда студенты должны переезжать только на него.'
+        )
+        assert len(moved) < len(keys) * 0.3
+
+    def test_empty_ring(self):
+        import pytest
+        from supervisor import HashRing
+        with pytest.raises(LookupError):
+            HashRing([]).node_for('student')
+
+    def test_shard_path(self):
+        from supervisor import shard_path
+        assert shard_path('/tmp/outbox.jsonl', 2) == '/tmp/outbox.shard2.jsonl'
+
+
+    def test_pending_messages_follow_tenants_to_new_shards(
+            self, tmp_path, homework_module):
+        import outbox
+        import tenants
+        from supervisor import HashRing, shard_path
+        path = str(tmp_path / 'outbox.jsonl')
+        names = [f'student-{number}' for number in range(20)]
+        before = HashRing(range(3))
+        for shard in range(3):
+            box = outbox.Outbox(shard_path(path, shard))
+            for name in names:
+                if before.node_for(name) == shard:
+                    box.add(name, f'статус {name}')
+            box.close()
+        after = HashRing(range(2))
+        pending = {}
+        for shard in range(2):
+            box = outbox.install(outbox.Outbox(shard_path(path, shard)))
+            for name in names:
+                if after.node_for(name) != shard:
+                    continue
+                with tenants.activate(tenants.Tenant(name, 'token', '1')):
+                    homework_module.resume_tenant(0)
+                pending[name] = [entry.text for entry in box.due(name)]
+        assert pending == {name: [f'статус {name}'] for name in names}, (
+            'Неотправленные сообщения должны переезжать вместе со студентом.'
+        )
+        assert len(outbox.Outbox(shard_path(path, 2))) == 0
+
+
+class TestSupervisor:
+
+    def test_crashed_worker_is_restarted_with_backoff(self):
+        from supervisor import Supervisor
+        clock = utils.FakeClock()
+        supervisor = Supervisor('tenants.json', 2, target=crash,
+                                context=multiprocessing.get_context('fork'),
+                                restart_delay=1, clock=clock)
+        supervisor.start()
+        try:
+            wait_exit(supervisor)
+            supervisor.check()
+            assert supervisor.restarts == 0
+            clock.now = 1
+            supervisor.check()
+            assert supervisor.restarts == 2
+            wait_exit(supervisor)
+            clock.now = 2
+            supervisor.check()
+            clock.now = 3
+            supervisor.check()
+            assert supervisor.restarts == 2, (
+                'Повторное падение должно удваивать паузу перед перезапуском.'
+            )
+            clock.now = 4
+            supervisor.check()
+            assert supervisor.restarts == 4
+        finally:
+            supervisor.stop(deadline=0)
+
+    def test_stop_terminates_workers(self):
+        from supervisor import Supervisor
+        supervisor = Supervisor('tenants.json', 2, target=idle,
+                                context=multiprocessing.get_context('fork'))
+        supervisor.start()
+        started = time.monotonic()
+        supervisor.stop(deadline=1)
+        assert time.monotonic() - started < 1
+        assert all(process.exitcode is not None
+                   for process in supervisor.processes.values())
+
+    def test_profiling_signal_is_forwarded_to_workers(self, tmp_path):
+        from supervisor import Supervisor
+        supervisor = Supervisor(str(tmp_path), 2, target=record_usr1,
+                                context=multiprocessing.get_context('fork'))
+        for delay, signum in ((0.3, signal.SIGUSR1), (0.6, signal.SIGTERM)):
+            threading.Timer(delay, os.kill, (os.getpid(), signum)).start()
+        supervisor.run()
+        assert sorted(os.listdir(tmp_path)) == ['usr1-0', 'usr1-1'], (
+            'SIGUSR1 не должен завершать супервизор, его получают шарды.'
+        )
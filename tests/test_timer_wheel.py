@@ -0,0 +1,44 @@
+import random
+
+
+class TestTimerWheel:
+
+    def test_timers_fire_on_time_across_levels(self):
+        from timer_wheel import TimerWheel
+        wheel = TimerWheel(tick=1, level_slots=(8, 4, 4))
+        rng = random.Random(7)
+        delays = [rng.randint(1, 300) for _ in range(200)]
+        for number, delay in enumerate(delays):
+            wheel.schedule(delay, number)
+        fired = {}
+        for second in range(1, 301):
+            for number in wheel.advance(second):
+                fired[number] = second
+        assert len(wheel) == 0
+        assert all(fired[number] == delay
+                   for number, delay in enumerate(delays)), (
+            'Таймер должен срабатывать ровно через заданную задержку.'
+        )
+
+    def test_cancel_and_reschedule(self):
+        from timer_wheel import TimerWheel
+        wheel = TimerWheel(tick=0.5)
+        timer = wheel.schedule(2, 'a')
+        wheel.schedule(2, 'b')
+        assert wheel.cancel(timer)
+        assert not wheel.cancel(timer)
+        assert wheel.advance(1.5) == []
+        assert wheel.advance(2) == ['b']
+        late = wheel.schedule(1, 'c')
+        assert wheel.advance(3) == ['c']
+        assert not late.active
+
+    def test_stagger_spreads_start(self):
+        from timer_wheel import TimerWheel
+        wheel = TimerWheel(tick=1)
+        wheel.stagger(range(100), window=10)
+        per_second = [len(wheel.advance(second)) for second in range(1, 11)]
+        assert sum(per_second) == 100
+        assert max(per_second) - min(per_second) <= 2, (
+            'Первые опросы должны равномерно распределяться по окну.'
+        )
@@ -0,0 +1,120 @@
+import math
+from typing import Any, Iterable, Optional
+
+TICK = 1.0
+LEVEL_SLOTS = (256, 64, 64, 64)
+
+
+class Timer:
+    """Таймер колеса; хранит полезную нагрузку и слот, где лежит."""
+
+    __slots__ = ('expiry', 'payload', '_slot')
+
+    def __init__(self, expiry: int, payload: Any) -> None:
+        """Создаёт таймер, срабатывающий на тике expiry."""
+        self.expiry = expiry
+        self.payload = payload
+        self._slot: Optional[dict] = None
+
+    @property
+    def active(self) -> bool:
+        """Проверяет, что таймер ещё не сработал и не отменён."""
+        return self._slot is not None
+
+
+class TimerWheel:
+    """
+    Иерархическое колесо таймеров.
+    Уровень 0 хранит таймеры ближайших LEVEL_SLOTS[0] тиков, каждый
+    следующий уровень — в LEVEL_SLOTS[i] раз более длинные интервалы.
+    Вставка и отмена выполняются за O(1); при переходе через границу
+    уровня его слот раскладывается по нижним уровням.
+    """
+
+    def __init__(self, tick: float = TICK,
+                 level_slots: Iterable[int] = LEVEL_SLOTS,
+                 start: float = 0.0) -> None:
+        """Создаёт пустое колесо с разрешением tick секунд."""
+        self.tick = tick
+        self.start = start
+        self.current_tick = 0
+        self._sizes = tuple(level_slots)
+        self._spans = [math.prod(self._sizes[:level])
+                       for level in range(len(self._sizes) + 1)]
+        self._levels = [[{} for _ in range(size)] for size in self._sizes]
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Возвращает число активных таймеров."""
+        return self._count
+
+    @property
+    def now(self) -> float:
+        """Время, до которого колесо уже провернулось."""
+        return self.start + self.current_tick * self.tick
+
+    def _place(self, timer: Timer) -> None:
+        top = len(self._sizes) - 1
+        for level in range(top + 1):
+            block = self._spans[level + 1]
+            if level == top or timer.expiry // block == (
+                    self.current_tick // block):
+                break
+        slot = self._levels[level][
+            timer.expiry // self._spans[level] % self._sizes[level]
+        ]
+        slot[timer] = None
+        timer._slot = slot
+
+    def schedule(self, delay: float, payload: Any) -> Timer:
+        """Ставит таймер, который сработает через delay секунд."""
+        ticks = max(math.ceil(delay / self.tick), 1)
+        timer = Timer(self.current_tick + ticks, payload)
+        self._place(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer: Timer) -> bool:
+        """Отменяет таймер; False, если он уже сработал или отменён."""
+        if timer._slot is None:
+            return False
+        del timer._slot[timer]
+        timer._slot = None
+        self._count -= 1
+        return True
+
+    def stagger(self, payloads: Iterable[Any], window: float) -> list[Timer]:
+        """Равномерно распределяет первые срабатывания по окну window."""
+        payloads = list(payloads)
+        step = window / len(payloads) if payloads else 0
+        return [self.schedule(index * step, payload)
+                for index, payload in enumerate(payloads)]
+
+    def _cascade(self) -> None:
+        for level in range(len(self._sizes) - 1, 0, -1):
+            if self.current_tick % self._spans[level]:
+                continue
+            index = self.current_tick // self._spans[level]
+            slot = self._levels[level][index % self._sizes[level]]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._place(timer)
+
+    def _step(self) -> list[Any]:
+        self.current_tick += 1
+        self._cascade()
+        slot = self._levels[0][self.current_tick % self._sizes[0]]
+        expired = list(slot)
+        slot.clear()
+        for timer in expired:
+            timer._slot = None
+        self._count -= len(expired)
+        return [timer.payload for timer in expired]
+
+    def advance(self, now: float) -> list[Any]:
+        """Проворачивает колесо до момента now и возвращает сработавшие."""
+        expired = []
+        while self.now + self.tick <= now:
+            expired.extend(self._step())
+        return expired